@@ -0,0 +1,43 @@
+"""
+自适应并发基准：本地流服务只能同时处理capacity个请求，超出部分排队导致延迟上升
+- 固定并发（高于/等于服务容量） vs AIMD自适应并发（从低并发起步）
+
+用法: python benchmarks/bench_adaptive.py [频道数] [服务容量]
+"""
+import sys
+import asyncio
+import configparser
+from common import stream_server, timed
+
+from core import Channel, SpeedTester
+
+
+def run(base_url, count, concurrency, options):
+    channels = [Channel(name=f"频道{i}", url=f"{base_url}/live/{i}.ts") for i in range(count)]
+    config = configparser.ConfigParser()
+    config.read_dict({'TESTER': {'max_http_latency': '150', 'keep_alive': 'true', **options}})
+    tester = SpeedTester(timeout=3, concurrency=concurrency, enable_logging=False, config=config)
+    elapsed, _ = timed(lambda: asyncio.run(tester.test_channels(channels)))
+    online = [c for c in channels if c.status == 'online']
+    latency = sum(c.response_time for c in online) / len(online) if online else 0
+    return elapsed, len(online), latency, tester
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 6000
+    capacity = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    with stream_server(delay=0.05, size=64 * 1024, capacity=capacity) as base_url:
+        print(f"本地流服务: {base_url} | 频道: {count} | 服务容量: {capacity} | 最大延迟: 150ms")
+        for label, concurrency, options in (
+            (f"固定并发{capacity * 5 // 2}", capacity * 5 // 2, {}),
+            (f"固定并发{capacity}", capacity, {}),
+            ("自适应并发", 8, {'adaptive_concurrency': 'true', 'min_concurrency': '4', 'max_concurrency': str(capacity * 5)}),
+        ):
+            elapsed, online, latency, tester = run(base_url, count, concurrency, options)
+            print(f"  {label}: {elapsed:.2f}s | 在线: {online} | 平均延迟: {latency:.0f}ms")
+            if tester.limiter:
+                print(f"    并发曲线: {tester.limiter.curve_summary()} | 下调{tester.limiter.decreases}次")
+
+
+if __name__ == '__main__':
+    main()
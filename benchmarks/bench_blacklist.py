@@ -0,0 +1,61 @@
+"""
+黑名单匹配基准：逐条子串扫描 vs Aho-Corasick自动机 vs 分层索引
+
+分层索引的URL/域名两层只检查频道URL（不检查名称），因此混入的名称命中样本
+只取关键词层条目；URL命中样本附加的查询参数使用正确的分隔符。
+
+用法: python benchmarks/bench_blacklist.py [样本频道数]
+"""
+import sys
+from common import BLACKLIST_PATH, load_sample_channels, timed
+
+from core import BlacklistIndex, BlacklistMatcher, Channel
+from main import load_list_file
+
+
+def naive_is_blacklisted(channel, blacklist) -> bool:
+    """旧版实现（O(频道数 × 条目数)）"""
+    channel_name = channel.name.lower()
+    channel_url = channel.url.lower()
+    return any(
+        entry in channel_name or entry in channel_url
+        for entry in blacklist
+        if entry.strip() and not entry.startswith('#')
+    )
+
+
+def main():
+    sample = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    entries = load_list_file(str(BLACKLIST_PATH))
+    channels = load_sample_channels(sample)
+    # 混入部分命中样本（黑名单条目出现在URL或名称中）
+    for i, entry in enumerate(sorted(entries)[::50]):
+        tier, _ = BlacklistIndex.classify_entry(entry)
+        if i % 2 and tier == 'keyword':
+            channels.append(Channel(name=f"测试{entry.upper()}频道", url="http://example.com/live.m3u8"))
+        elif tier == 'host':
+            channels.append(Channel(name="测试频道", url=f"http://{entry}/live.m3u8?token={i}"))
+        else:
+            separator = '&' if '?' in entry else '?'
+            channels.append(Channel(name="测试频道", url=f"{entry}{separator}token={i}"))
+
+    build_time, matcher = timed(BlacklistMatcher, entries)
+    naive_time, naive_hits = timed(lambda: [naive_is_blacklisted(c, entries) for c in channels])
+    fast_time, fast_hits = timed(lambda: [matcher.is_blacklisted(c) for c in channels], repeat=3)
+
+    index_build_time, index = timed(BlacklistIndex.load, str(BLACKLIST_PATH), repeat=3)
+    index_time, index_hits = timed(lambda: [index.is_blacklisted(c) for c in channels], repeat=3)
+
+    assert naive_hits == fast_hits, "匹配结果不一致"
+    assert index_hits == naive_hits, "分层索引匹配结果不一致"
+    print(f"黑名单条目: {len(entries)} | 样本频道: {len(channels)} | 命中: {sum(fast_hits)}")
+    print(f"自动机构建: {build_time * 1000:.1f}ms")
+    print(f"逐条扫描:   {naive_time * 1000:.1f}ms ({naive_time / len(channels) * 1e6:.1f}µs/频道)")
+    print(f"自动机扫描: {fast_time * 1000:.1f}ms ({fast_time / len(channels) * 1e6:.1f}µs/频道)")
+    print(f"加速比: {naive_time / fast_time:.0f}x")
+    print(f"分层索引构建: {index_build_time * 1000:.1f}ms | 分层: {index.stats()}")
+    print(f"分层索引扫描: {index_time * 1000:.1f}ms ({index_time / len(channels) * 1e6:.1f}µs/频道) | 命中: {sum(index_hits)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+熔断基准：不可达端点上的大量频道，关闭熔断 vs 启用熔断
+并校验半开探测以非网络异常结束后端点仍会被重新探测（不会永久跳过）
+
+用法: python benchmarks/bench_breaker.py [频道数] [并发数]
+"""
+import sys
+import socket
+import asyncio
+import configparser
+from common import timed
+
+from core import Channel, SpeedTester
+
+
+def make_tester(concurrency: int, threshold: int, cooldown: float = 60) -> SpeedTester:
+    config = configparser.ConfigParser()
+    config.read_dict({'TESTER': {'breaker_threshold': str(threshold), 'breaker_cooldown': str(cooldown)}})
+    return SpeedTester(timeout=2, concurrency=concurrency, enable_logging=False, config=config)
+
+
+def check_probe_release() -> None:
+    """半开探测抛出ValueError后，下一个请求应重新获得探测名额"""
+    tester = make_tester(1, threshold=1, cooldown=0)
+    channel = Channel(name="探测", url="http://127.0.0.1:9/live.ts")
+    endpoint = channel.info.endpoint
+
+    async def broken_probe(*_):
+        raise ValueError("探测内部异常")
+
+    tester._probe_get = tester._probe_head_get = broken_probe
+    tester.breaker.record_failure(endpoint)
+    assert tester.breaker.allow(endpoint), "冷却结束后应放行半开探测"
+    assert asyncio.run(tester._unified_test(None, channel)) == (False, 0.0, 0.0)
+    assert tester.breaker.allow(endpoint), "探测异常后端点被永久跳过"
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    check_probe_release()
+
+    # 绑定后不监听的端口：连接立即被拒绝
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        print(f"不可达端点: 127.0.0.1:{port} | 频道: {count} | 并发: {concurrency}")
+        for label, threshold in (("关闭熔断", 0), ("启用熔断", 3)):
+            channels = [Channel(name=f"频道{i}", url=f"http://127.0.0.1:{port}/live/{i}.ts") for i in range(count)]
+            tester = make_tester(concurrency, threshold)
+            elapsed, _ = timed(lambda: asyncio.run(tester.test_channels(channels, None, set())))
+            print(
+                f"  {label}: {elapsed:.2f}s | 离线: {sum(1 for c in channels if c.status == 'offline')} | "
+                f"熔断: {tester.breaker.trips} | 跳过: {tester.breaker.skipped}"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""
+并行分类基准：串行匹配 vs 进程池（1/2/4/8个进程）
+
+用法: python benchmarks/bench_classify.py [名称变体倍数]
+"""
+import os
+import sys
+import configparser
+from common import M3U_PATH, TEMPLATES_PATH, load_sample_channels, timed
+
+from core import AutoCategoryMatcher, PlaylistParser
+
+VARIANTS = ['', ' HD', '-高清', ' 备用', '(测试)', ' 4K', '_源2', ' plus']
+
+
+def sample_names(copies: int):
+    """自带样本名称 + 常见后缀变体（模拟多个订阅源中的同名频道写法差异）"""
+    base = [c.name for c in load_sample_channels()]
+    base += [c.name for c in PlaylistParser().parse(M3U_PATH.read_text(encoding='utf-8'))]
+    base = list(dict.fromkeys(base))
+    names = [name + suffix for suffix in VARIANTS[:copies] for name in base]
+    return list(dict.fromkeys(names))
+
+
+def classify(workers: int, names):
+    config = configparser.ConfigParser()
+    config.read_dict({'PERFORMANCE': {'classification_workers': str(workers)}})
+    matcher = AutoCategoryMatcher(str(TEMPLATES_PATH), config)
+    return matcher.batch_match(names)
+
+
+def main():
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    names = sample_names(copies)
+    print(f"去重名称: {len(names)} | CPU核心: {os.cpu_count()}")
+
+    serial_time, expected = timed(classify, 0, names)
+    print(f"  串行:   {serial_time:.2f}s")
+    for workers in (1, 2, 4, 8):
+        pool_time, result = timed(classify, workers, names)
+        status = "一致" if result == expected else "不一致"
+        print(f"  {workers}进程: {pool_time:.2f}s | 加速比: {serial_time / pool_time:.2f}x | 结果{status}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+分布式测速基准（单机）：协调器 + 多个本地工作节点
+- 不同工作节点数的耗时
+- 工作节点丢失：测速中途强制结束一个节点，租约超时后分片重新分发，所有频道仍得到结果
+
+用法: python benchmarks/bench_distributed.py [频道数] [主机数]
+"""
+import sys
+import asyncio
+import configparser
+import multiprocessing
+from common import stream_server, timed
+
+from core import Channel, SpeedTester, TestCoordinator
+
+
+def make_channels(base_url, count, hosts):
+    port = base_url.rsplit(':', 1)[1]
+    return [
+        Channel(name=f"频道{i}", url=f"http://127.0.0.{i % hosts + 1}:{port}/live/{i}.ts")
+        for i in range(count)
+    ]
+
+
+def make_coordinator(local_workers, lease_timeout=60.0):
+    config = configparser.ConfigParser()
+    config.read_dict({'TESTER': {'keep_alive': 'true'}})
+    tester = SpeedTester(timeout=5, concurrency=50, enable_logging=False, config=config)
+    return TestCoordinator(tester, port=0, shard_size=500, lease_timeout=lease_timeout, local_workers=local_workers)
+
+
+async def kill_one_worker(delay):
+    """等待delay秒后强制结束一个本地工作节点进程"""
+    await asyncio.sleep(delay)
+    workers = [p for p in multiprocessing.active_children() if p.name != 'stream_server']
+    if workers:
+        workers[0].kill()
+
+
+async def run_with_loss(coordinator, channels):
+    killer = asyncio.create_task(kill_one_worker(3))
+    await coordinator.run(channels)
+    await killer
+
+
+def report(label, elapsed, channels, coordinator):
+    online = sum(1 for c in channels if c.status == 'online')
+    pending = sum(1 for c in channels if c.status == 'pending')
+    print(f"  {label}: {elapsed:.2f}s | 在线: {online} | 未完成: {pending} | {coordinator.summary()}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    hosts = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    with stream_server(delay=0.02, size=32 * 1024, hosts=hosts) as base_url:
+        print(f"本地流服务: {base_url} | 频道: {count} | 主机: {hosts}")
+        for workers in (1, 2, 4):
+            channels = make_channels(base_url, count, hosts)
+            coordinator = make_coordinator(workers)
+            elapsed, _ = timed(lambda: asyncio.run(coordinator.run(channels)))
+            report(f"{workers}个工作节点", elapsed, channels, coordinator)
+
+        channels = make_channels(base_url, count, hosts)
+        coordinator = make_coordinator(2, lease_timeout=5)
+        elapsed, _ = timed(lambda: asyncio.run(run_with_loss(coordinator, channels)))
+        report("2个节点，3秒后丢失1个", elapsed, channels, coordinator)
+
+
+if __name__ == '__main__':
+    main()
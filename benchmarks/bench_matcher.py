@@ -0,0 +1,57 @@
+"""
+分类匹配基准：逐分类逐条正则search（旧版） vs 字面量自动机+正则短列表
+
+用法: python benchmarks/bench_matcher.py
+"""
+from common import M3U_PATH, TEMPLATES_PATH, load_sample_channels, timed
+
+from core import AutoCategoryMatcher, PlaylistParser
+
+
+def legacy_match(matcher: AutoCategoryMatcher, channel_name: str) -> str:
+    """旧版实现：按分类顺序对每条正则调用search，首个命中的分类胜出"""
+    normalized_name = matcher.normalize_channel_name(matcher._clean_channel_name(channel_name))
+    for category, patterns in matcher.categories.items():
+        for pattern in patterns:
+            if pattern.search(normalized_name):
+                return category
+    return "未分类"
+
+
+def main():
+    matcher = AutoCategoryMatcher(str(TEMPLATES_PATH))
+    print(f"模板条目: 字面量 {len(matcher.template.literal_index)} | 正则 {len(matcher.template.regex_rules)}")
+
+    # 未分类样本（基本都走完整匹配流程）+ 已分类的导出结果（验证分类优先级）
+    samples = {
+        '未分类样本': [c.name for c in load_sample_channels()],
+        '导出结果': [c.name for c in PlaylistParser().parse(M3U_PATH.read_text(encoding='utf-8'))],
+    }
+    for label, names in samples.items():
+        bench(matcher, label, names)
+
+
+def bench(matcher: AutoCategoryMatcher, label: str, names):
+    distinct = list(dict.fromkeys(names))
+    print(f"{label}: {len(names)}个名称 (去重后 {len(distinct)})")
+
+    # 预热名称标准化缓存，只比较模板匹配本身
+    for name in distinct:
+        matcher.normalize_channel_name(matcher._clean_channel_name(name))
+
+    legacy_time, legacy_result = timed(lambda: [legacy_match(matcher, n) for n in distinct])
+
+    def indexed():
+        matcher.match_cache.clear()
+        return [matcher.match(n) for n in distinct]
+    index_time, index_result = timed(indexed, repeat=3)
+
+    mismatches = sum(1 for a, b in zip(legacy_result, index_result) if a != b)
+    classified = sum(1 for c in index_result if c != "未分类")
+    print(f"  旧版: {legacy_time * 1000:.1f}ms ({legacy_time / len(distinct) * 1e6:.1f}µs/名称)")
+    print(f"  索引: {index_time * 1000:.1f}ms ({index_time / len(distinct) * 1e6:.1f}µs/名称) | 加速比: {legacy_time / index_time:.1f}x")
+    print(f"  已分类: {classified} | 结果不一致: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
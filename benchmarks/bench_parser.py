@@ -0,0 +1,84 @@
+"""
+解析器基准：逐行多正则匹配（旧版） vs 单遍状态机
+
+用法: python benchmarks/bench_parser.py
+"""
+import re
+from urllib.parse import urlparse, urlunparse, parse_qs, urlencode
+from common import M3U_PATH, UNCATEGORIZED_PATH, timed
+
+from core import PlaylistParser
+
+PARAMS_TO_REMOVE = {'key', 'playlive', 'authid'}
+
+
+class LegacyParser:
+    """旧版解析逻辑（每行最多3个正则 + 名称正则 + 两次urlparse）"""
+
+    CHANNEL_REGEX = re.compile(r'^(.*?),(http.*)$', re.MULTILINE)
+    EXTINF_REGEX = re.compile(
+        r'#EXTINF:-?[\d.]*,?(.*?)(?:\s+tvg-name="([^"]*)")?(?:\s+tvg-logo="([^"]*)")?(?:\s+group-title="([^"]*)")?.*\n(.*)',
+        re.IGNORECASE
+    )
+    GROUP_TITLE_REGEX = re.compile(r'group-title="([^"]+)"')
+
+    def parse(self, content):
+        category, extinf, result = None, None, []
+        for line in content.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('#EXTINF'):
+                extinf = line
+                if match := self.GROUP_TITLE_REGEX.search(line):
+                    category = match.group(1)
+                elif match := self.EXTINF_REGEX.match(line):
+                    category = match.group(4) or category
+            elif extinf and line.startswith('http'):
+                self.EXTINF_REGEX.match(extinf)
+                result.append((self._clean_name(self._clean_name(extinf)), self._clean_url(line), category))
+                extinf = None
+            elif match := self.CHANNEL_REGEX.match(line):
+                result.append((self._clean_name(match.group(1)), self._clean_url(match.group(2)), category))
+            else:
+                self.EXTINF_REGEX.match(line)
+        return result
+
+    def _clean_name(self, raw_name):
+        if raw_name.startswith('#EXTINF'):
+            if match := re.search(r'#EXTINF:-?\d+,(.*)', raw_name):
+                return match.group(1).strip()
+        return raw_name.split(',')[-1].strip()
+
+    def _clean_url(self, url):
+        url = url.split('$')[0].strip()
+        parsed = urlparse(url)
+        if parsed.query:
+            query_params = parse_qs(parsed.query, keep_blank_values=True)
+            filtered = {k: v for k, v in query_params.items() if k not in PARAMS_TO_REMOVE}
+            url = urlunparse(parsed._replace(query=urlencode(filtered, doseq=True)))
+        parsed = urlparse(url)
+        return url if parsed.scheme and parsed.netloc else ""
+
+
+def main():
+    parser = PlaylistParser()
+    parser.set_url_filters(PARAMS_TO_REMOVE)
+    legacy = LegacyParser()
+
+    for path in (M3U_PATH, UNCATEGORIZED_PATH):
+        content = path.read_text(encoding='utf-8')
+        lines = content.count('\n')
+        legacy_time, legacy_result = timed(legacy.parse, content, repeat=3)
+        new_time, new_result = timed(lambda: list(parser.parse(content)), repeat=3)
+        print(f"{path.name}: {lines}行 | 频道: 旧 {len(legacy_result)} / 新 {len(new_result)}")
+        print(f"  旧版: {legacy_time * 1000:.1f}ms ({lines / legacy_time / 1000:.0f}k行/秒)")
+        print(f"  新版: {new_time * 1000:.1f}ms ({lines / new_time / 1000:.0f}k行/秒) | 加速比: {legacy_time / new_time:.2f}x")
+
+    sample = '#EXTINF:-1 tvg-id="CCTV1" tvg-name="CCTV1" tvg-logo="http://x/1.png" group-title="央视频道" catchup="append",CCTV-1 综合'
+    extinf_time, _ = timed(lambda: [PlaylistParser.parse_extinf(sample) for _ in range(100000)])
+    print(f"EXTINF属性解析: {extinf_time / 100000 * 1e6:.2f}µs/行 -> {PlaylistParser.parse_extinf(sample)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""
+分片测速基准：单进程测速 vs 按主机分片到多个进程
+本地流服务监听多个回环地址（模拟多个主机），服务端使用多个进程避免成为瓶颈
+
+用法: python benchmarks/bench_shard.py [频道数] [主机数] [每进程并发数]
+"""
+import os
+import sys
+import asyncio
+import configparser
+from common import stream_server, timed
+
+from core import Channel, SpeedTester
+
+
+def run(base_url, count, hosts, concurrency, processes):
+    port = base_url.rsplit(':', 1)[1]
+    channels = [
+        Channel(name=f"频道{i}", url=f"http://127.0.0.{i % hosts + 1}:{port}/live/{i}.ts")
+        for i in range(count)
+    ]
+    config = configparser.ConfigParser()
+    config.read_dict({
+        'TESTER': {'keep_alive': 'true', 'enable_preprobe': 'false'},
+        'PERFORMANCE': {'test_processes': str(processes)},
+    })
+    tester = SpeedTester(timeout=5, concurrency=concurrency, enable_logging=False, config=config)
+    elapsed, _ = timed(lambda: asyncio.run(tester.test_channels(channels)))
+    online = sum(1 for c in channels if c.status == 'online')
+    return elapsed, online
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    hosts = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+    cores = os.cpu_count() or 1
+    with stream_server(delay=0.01, size=32 * 1024, hosts=hosts, processes=max(1, cores // 2)) as base_url:
+        print(f"本地流服务: {base_url} | 频道: {count} | 主机: {hosts} | 每进程并发: {concurrency} | CPU核数: {cores}")
+        baseline = None
+        for processes in sorted({1, 2, 4, cores}):
+            elapsed, online = run(base_url, count, hosts, concurrency, processes)
+            baseline = baseline or elapsed
+            print(
+                f"  {processes}个进程: {elapsed:.2f}s | {count / elapsed:.0f}频道/秒 | "
+                f"在线: {online} | 加速比: {baseline / elapsed:.2f}x"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+模板排序基准：逐分类扫描（旧版） vs 单遍分桶排序
+
+用法: python benchmarks/bench_sort.py [最大频道数]
+"""
+import sys
+import random
+from common import TEMPLATES_PATH, timed
+
+from core import AutoCategoryMatcher, Channel
+
+# 旧版在频道数超过此值后耗时过长，只运行新版
+LEGACY_LIMIT = 50000
+
+
+def legacy_sort(matcher: AutoCategoryMatcher, channels, whitelist):
+    """旧版实现：每个分类扫描一次全部频道，并对白名单频道列表做成员判断"""
+    whitelist_channels = [c for c in channels if c.name.lower() in whitelist]
+    sorted_channels = []
+    for category in matcher.template_order:
+        category_channels = [
+            c for c in channels
+            if c not in whitelist_channels and c.category == category
+        ]
+        order_index = matcher.template.order_index[category]
+        missing = len(matcher.template_order[category])
+        sorted_channels.extend(sorted(
+            category_channels,
+            key=lambda c: order_index.get(matcher.normalize_channel_name(c.name), missing)
+        ))
+    uncategorized = [
+        c for c in channels
+        if c not in whitelist_channels and c.category not in matcher.template_order
+    ]
+    sorted_channels.extend(uncategorized)
+    return whitelist_channels + sorted_channels
+
+
+def synthetic_channels(matcher: AutoCategoryMatcher, count: int):
+    """
+    生成合成频道：约80%取模板中的标准名称（含分类），其余为模板外名称；
+    白名单约为频道数的0.5%（名称小写）
+    """
+    rng = random.Random(42)
+    entries = [(category, name) for category, names in matcher.template_order.items() for name in names]
+    channels = []
+    for i in range(count):
+        if rng.random() < 0.8:
+            category, name = rng.choice(entries)
+            name += rng.choice(['', '高清', ' HD'])
+        else:
+            category, name = "未分类", f"频道{rng.randrange(count)}"
+        channel = Channel(name=name, url=f"http://10.0.{i >> 8 & 255}.{i & 255}/{i}.m3u8")
+        channel.category = category
+        channels.append(channel)
+    whitelist = {c.name.lower() for c in rng.sample(channels, max(1, count // 200))}
+    return channels, whitelist
+
+
+def main():
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    matcher = AutoCategoryMatcher(str(TEMPLATES_PATH))
+    print(f"模板分类: {len(matcher.template_order)}")
+
+    count = 12500
+    while count <= limit:
+        channels, whitelist = synthetic_channels(matcher, count)
+        # 预热名称标准化缓存，只比较排序本身
+        for channel in channels:
+            matcher.normalize_channel_name(channel.name)
+
+        new_time, new_result = timed(matcher.sort_channels_by_template, channels, whitelist, repeat=3)
+        line = f"  {count:>7}个频道 (白名单{len(whitelist)}): 分桶 {new_time * 1000:7.1f}ms ({new_time / count * 1e6:.2f}µs/频道)"
+        if count <= LEGACY_LIMIT:
+            legacy_time, legacy_result = timed(legacy_sort, matcher, channels, whitelist)
+            same = all(a is b for a, b in zip(legacy_result, new_result)) and len(legacy_result) == len(new_result)
+            line += f" | 旧版 {legacy_time * 1000:9.1f}ms | 加速比: {legacy_time / new_time:.0f}x | 结果{'一致' if same else '不一致'}"
+        print(line)
+        count *= 2
+
+
+if __name__ == '__main__':
+    main()
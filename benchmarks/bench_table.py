@@ -0,0 +1,90 @@
+"""
+频道存储内存基准：Channel对象列表 vs 列式ChannelTable
+
+用法: python benchmarks/bench_table.py [频道数]
+"""
+import gc
+import sys
+import random
+import tracemalloc
+from common import timed
+
+from core import Channel, ChannelTable
+from core.urls import UrlInfo
+
+CATEGORIES = [f"分组{i:03d}" for i in range(120)]
+
+
+def synthetic_records(count: int):
+    """
+    生成合成频道记录 (名称, URL, 原始分组, 去重键, URL信息)
+    分组名从原始行切片得到，与解析器一样每个频道持有独立的字符串对象；
+    主机数约为频道数的1/6（与仓库自带的未分类频道样本比例相近），URL信息按端点共享（与解析器一致）
+    """
+    rng = random.Random(42)
+    hosts = max(1, count // 6)
+    infos = {}
+    for i in range(count):
+        line = f'#EXTINF:-1 group-title="{rng.choice(CATEGORIES)}",'
+        category = line[line.index('"') + 1:line.rindex('"')]
+        host_no = rng.randrange(hosts)
+        host = f"10.{host_no >> 16 & 255}.{host_no >> 8 & 255}.{host_no & 255}:{(80, 8080, 9901)[host_no % 3]}"
+        url = f"http://{host}/live/{i}/index.m3u8"
+        info = infos.setdefault(host, UrlInfo.from_url(url))
+        yield f"频道{rng.randrange(5000)} 高清", url, category, url, info
+
+
+def fill_results(channels) -> None:
+    """模拟测速结果（每个频道写入状态、延迟、速度）"""
+    rng = random.Random(7)
+    for channel in channels:
+        online = rng.random() < 0.4
+        channel.status = 'online' if online else 'offline'
+        channel.response_time = rng.uniform(20, 900) if online else 0.0
+        channel.download_speed = rng.uniform(50, 5000) if online else 0.0
+
+
+def build_objects(count: int):
+    channels = [
+        Channel(name=name, url=url, original_category=category, dedup_key=key, info=info)
+        for name, url, category, key, info in synthetic_records(count)
+    ]
+    for channel in channels:
+        channel.category = channel.original_category[:2] + "类"
+    fill_results(channels)
+    return channels
+
+
+def build_table(count: int):
+    table = ChannelTable()
+    table.extend(synthetic_records(count))
+    for row in table.rows():
+        row.category = row.original_category[:2] + "类"
+    fill_results(table.rows())
+    return table
+
+
+def measure(builder, count: int):
+    """返回 (保留的内存字节数, 构建耗时)"""
+    gc.collect()
+    tracemalloc.start()
+    build_time, result = timed(builder, count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, build_time
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    object_bytes, object_time = measure(build_objects, count)
+    table_bytes, table_time = measure(build_table, count)
+
+    print(f"合成频道: {count}条 | 分组: {len(CATEGORIES)}")
+    print(f"  Channel列表: {object_bytes / 1024 / 1024:.1f}MB ({object_bytes / count:.0f}B/频道) | 构建 {object_time:.2f}s")
+    print(f"  ChannelTable: {table_bytes / 1024 / 1024:.1f}MB ({table_bytes / count:.0f}B/频道) | 构建 {table_time:.2f}s")
+    print(f"  内存减少: {(1 - table_bytes / object_bytes) * 100:.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+测速基准：
+- 调度：每频道一个任务+Condition槽位+分批休眠（旧版） vs 固定工作协程+有界队列
+- 探测：HEAD+GET两次请求 vs 单次GET
+- 连接：每个请求新建连接 vs 长连接复用
+
+用法: python benchmarks/bench_tester.py [频道数] [并发数]
+"""
+import gc
+import sys
+import asyncio
+import configparser
+import aiohttp
+from common import stream_server, timed
+
+from core import Channel, SpeedTester
+
+
+class LegacySpeedTester(SpeedTester):
+    """旧版调度：每个频道创建一个任务，槽位释放时notify_all唤醒全部等待者"""
+
+    async def test_channels(self, channels, progress_cb=None, failed_urls=None, white_list=None):
+        failed_urls = failed_urls if failed_urls is not None else set()
+        white_list = white_list or set()
+        progress_cb = progress_cb or (lambda _: None)
+        active = 0
+        condition = asyncio.Condition()
+
+        async def limited(session, channel):
+            nonlocal active
+            try:
+                await self._test_single_channel(session, channel, progress_cb, failed_urls, white_list)
+            finally:
+                async with condition:
+                    active -= 1
+                    condition.notify_all()
+
+        connector = aiohttp.TCPConnector(limit=self.concurrency, force_close=True, enable_cleanup_closed=True, ssl=False)
+        async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout)) as session:
+            tasks = []
+            for channel in channels:
+                async with condition:
+                    await condition.wait_for(lambda: active < self.concurrency)
+                    active += 1
+                tasks.append(asyncio.create_task(limited(session, channel)))
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def legacy_run(tester, channels):
+    """旧版main.test_channels：每批最多1000个频道，批间休眠1秒并gc.collect()"""
+    failed_urls = set()
+    batch_size = min(1000, len(channels) // 10 or 100)
+    for i in range(0, len(channels), batch_size):
+        await tester.test_channels(channels[i:i + batch_size], None, failed_urls)
+        if i + batch_size < len(channels):
+            await asyncio.sleep(1)
+            gc.collect()
+    return failed_urls
+
+
+async def pool_run(tester, channels):
+    failed_urls = set()
+    await tester.test_channels(channels, None, failed_urls)
+    return failed_urls
+
+
+async def with_task_monitor(coro):
+    """运行测速并采样存活任务数峰值"""
+    peak = 0
+    done = False
+
+    async def monitor():
+        nonlocal peak
+        while not done:
+            peak = max(peak, len(asyncio.all_tasks()))
+            await asyncio.sleep(0.01)
+
+    sampler = asyncio.create_task(monitor())
+    try:
+        result = await coro
+    finally:
+        done = True
+        await sampler
+    return result, peak
+
+
+def run(tester_cls, runner, base_url, count, concurrency, options):
+    channels = [Channel(name=f"频道{i}", url=f"{base_url}/live/{i}.ts") for i in range(count)]
+    config = configparser.ConfigParser()
+    config.read_dict({'TESTER': options})
+    tester = tester_cls(timeout=5, concurrency=concurrency, enable_logging=False, config=config)
+    elapsed, (failed, peak) = timed(lambda: asyncio.run(with_task_monitor(runner(tester, channels))))
+    online = sum(1 for c in channels if c.status == 'online')
+    return elapsed, online, len(failed), peak, tester
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    with stream_server(delay=0.02, size=32 * 1024) as base_url:
+        print(f"本地流服务: {base_url} | 频道: {count} | 并发: {concurrency}")
+        for label, tester_cls, runner, options in (
+            ("旧版调度+HEAD/GET", LegacySpeedTester, legacy_run, {'probe_mode': 'head_get'}),
+            ("工作协程+HEAD/GET", SpeedTester, pool_run, {'probe_mode': 'head_get'}),
+            ("工作协程+单次GET", SpeedTester, pool_run, {'probe_mode': 'get'}),
+            ("单次GET+长连接", SpeedTester, pool_run, {'probe_mode': 'get', 'keep_alive': 'true'}),
+        ):
+            elapsed, online, failed, peak, tester = run(tester_cls, runner, base_url, count, concurrency, options)
+            print(
+                f"  {label}: {elapsed:.2f}s | {count / elapsed:.0f}频道/秒 | "
+                f"在线: {online} | 失败: {failed} | 任务数峰值: {peak} | "
+                f"新建连接: {tester.connections_created} | 复用率: {tester.connection_reuse_ratio * 100:.1f}%"
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""基准测试公共工具（从仓库自带数据构造样本）"""
+import sys
+import time
+import socket
+import asyncio
+import multiprocessing
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core import Channel  # noqa: E402
+
+UNCATEGORIZED_PATH = ROOT / 'config' / 'uncategorized_channels.txt'
+BLACKLIST_PATH = ROOT / 'config' / 'blacklist.txt'
+TEMPLATES_PATH = ROOT / 'config' / 'templates.txt'
+M3U_PATH = ROOT / 'outputs' / 'all.m3u'
+
+
+def load_sample_channels(limit: int = 0) -> List[Channel]:
+    """从未分类频道文件加载 name,url 样本"""
+    channels = []
+    category = "未分类"
+    with open(UNCATEGORIZED_PATH, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.endswith(',#genre#'):
+                category = line.split(',')[0]
+                continue
+            name, _, url = line.partition(',')
+            if url:
+                channels.append(Channel(name=name, url=url, original_category=category))
+                if limit and len(channels) >= limit:
+                    break
+    return channels
+
+
+def timed(func: Callable, *args, repeat: int = 1) -> Tuple[float, object]:
+    """返回 (最佳耗时秒数, 最后一次结果)"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _serve_streams(port: int, delay: float, size: int, capacity: int, hosts: List[str]) -> None:
+    """
+    本地流媒体服务进程：HEAD/GET任意路径，延迟delay秒后返回size字节
+    capacity>0时同时只处理capacity个请求，其余排队（模拟过载时延迟上升）
+    """
+    from aiohttp import web
+
+    payload = b'\x47' * size
+    slots = asyncio.Semaphore(capacity) if capacity > 0 else None
+
+    async def handle(request):
+        if slots:
+            async with slots:
+                await asyncio.sleep(delay)
+        else:
+            await asyncio.sleep(delay)
+        if request.method == 'HEAD':
+            return web.Response(headers={'Content-Length': str(size)})
+        return web.Response(body=payload, content_type='video/mp2t')
+
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', handle)
+    web.run_app(app, host=hosts, port=port, reuse_port=True, print=None, access_log=None)
+
+
+@contextmanager
+def stream_server(delay: float = 0.02,
+                  size: int = 64 * 1024,
+                  capacity: int = 0,
+                  hosts: int = 1,
+                  processes: int = 1) -> Iterator[str]:
+    """
+    在子进程中启动本地流媒体服务，返回基础URL
+    hosts>1时同时监听127.0.0.1~127.0.0.{hosts}（Linux回环网段，用于模拟多个主机）；
+    processes>1时多个服务进程共享端口（SO_REUSEPORT），避免服务端成为瓶颈
+    """
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    addresses = [f"127.0.0.{i}" for i in range(1, hosts + 1)]
+    workers = [
+        multiprocessing.Process(target=_serve_streams, args=(port, delay, size, capacity, addresses), name='stream_server', daemon=True)
+        for _ in range(processes)
+    ]
+    for process in workers:
+        process.start()
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection((addresses[-1], port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.05)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        for process in workers:
+            process.terminate()
+            process.join()
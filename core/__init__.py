@@ -1,20 +1,32 @@
 # 基础模块
 from .models import Channel
+from .table import ChannelTable, ChannelRow
 from .fetcher import SourceFetcher
 from .parser import PlaylistParser
 from .matcher import AutoCategoryMatcher
 from .tester import SpeedTester
+from .distributed import TestCoordinator
+from .resolver import CachingResolver
 from .exporter import ResultExporter
+from .blacklist import BlacklistMatcher, BlacklistIndex
+from .pipeline import ChannelPipeline
 from .progress import SmartProgress
 
 # 显式声明导出的公共API
 __all__ = [
     'Channel',
+    'ChannelTable',
+    'ChannelRow',
     'SourceFetcher',
     'PlaylistParser',
     'AutoCategoryMatcher',
     'SpeedTester',
+    'TestCoordinator',
+    'CachingResolver',
     'ResultExporter',
+    'BlacklistMatcher',
+    'BlacklistIndex',
+    'ChannelPipeline',
     'SmartProgress'
 ]
 
@@ -0,0 +1,83 @@
+from array import array
+from typing import Dict, List
+
+class AhoCorasick:
+    """
+    Aho-Corasick多模式自动机
+
+    每个关键词关联一个正整数值，find() 单次扫描文本，返回命中关键词中的最小值（未命中为0）。
+    值越小优先级越高：黑名单全部取1（命中即返回），分类匹配取分类顺序。
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output = array('I', [0])
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    @property
+    def state_count(self) -> int:
+        return len(self._goto)
+
+    def add(self, word: str, value: int = 1) -> None:
+        """插入单个关键词（同一关键词多次插入时保留最小值）"""
+        if value <= 0:
+            raise ValueError("关键词值必须为正整数")
+        state = 0
+        for ch in word:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(0)
+                self._goto[state][ch] = next_state
+            state = next_state
+        if not self._output[state]:
+            self._size += 1
+            self._output[state] = value
+        else:
+            self._output[state] = min(self._output[state], value)
+
+    def build(self) -> None:
+        """广度优先构建失败指针，并沿失败链合并输出值（全部关键词插入后调用）"""
+        goto, fail, output = self._goto, self._fail, self._output
+        queue = list(goto[0].values())
+        for state in queue:
+            for ch, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and ch not in goto[fallback]:
+                    fallback = fail[fallback]
+                target = goto[fallback].get(ch, 0)
+                fail[next_state] = target if target != next_state else 0
+                inherited = output[fail[next_state]]
+                if inherited and (not output[next_state] or inherited < output[next_state]):
+                    output[next_state] = inherited
+
+    def find(self, text: str) -> int:
+        """扫描文本，返回命中关键词的最小值（命中值为1时提前返回），未命中返回0"""
+        goto, fail, output = self._goto, self._fail, self._output
+        best = 0
+        state = 0
+        for ch in text:
+            while True:
+                next_state = goto[state].get(ch)
+                if next_state is not None:
+                    state = next_state
+                    break
+                if not state:
+                    break
+                state = fail[state]
+            value = output[state]
+            if value and (not best or value < best):
+                if value == 1:
+                    return 1
+                best = value
+        return best
@@ -0,0 +1,200 @@
+import re
+import logging
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+from .models import Channel
+from .cache import file_digest, read_cache, write_cache
+from .automaton import AhoCorasick
+from .urls import canonical_url
+
+logger = logging.getLogger(__name__)
+
+class BlacklistMatcher(AhoCorasick):
+    """黑名单匹配器（Aho-Corasick多模式自动机）"""
+
+    # 名称与URL之间的分隔符（黑名单条目均为单行，不可能包含换行符）
+    SEPARATOR = '\n'
+
+    def __init__(self, entries: Iterable[str]):
+        """
+        构建自动机
+
+        参数:
+            entries: 黑名单关键词（与load_list_file相同：已去空格并转为小写）
+        """
+        super().__init__()
+        for entry in set(entries):
+            entry = entry.strip().lower()
+            if entry and not entry.startswith('#'):
+                self.add(entry)
+        self.build()
+
+        logger.debug(f"黑名单自动机构建完成 | 条目: {len(self)} | 状态数: {self.state_count}")
+
+    def search(self, text: str) -> bool:
+        """单次扫描判断文本是否包含任一关键词（text需已转为小写）"""
+        return self.find(text) > 0
+
+    def is_blacklisted(self, channel: Channel) -> bool:
+        """检查频道名称或URL是否命中黑名单（单次扫描名称+URL）"""
+        return self.match(channel.name, channel.url)
+
+    def match(self, name: str, url: str) -> bool:
+        """检查名称或URL是否命中黑名单"""
+        if not self:
+            return False
+        return self.search(f"{name}{self.SEPARATOR}{url}".lower())
+
+
+class BlacklistIndex:
+    """
+    分层黑名单索引
+
+    - 完整URL：两侧均转为规范形式（canonical_url），按协议+主机+路径查找，
+      条目中的查询参数须全部出现在频道URL中（顺序、附加参数、默认端口不影响匹配）
+    - 域名/IP[:端口]：按频道URL解析出的主机查找（域名条目同时匹配其子域名）
+    - 其余关键词：Aho-Corasick自动机对名称+URL做子串匹配
+
+    与逐条子串扫描的差异：URL/域名两层只检查频道URL，不检查频道名称。
+    """
+
+    # 分层规则或缓存结构变化时递增（旧缓存自动失效）
+    FORMAT_VERSION = 2
+
+    URL_REGEX = re.compile(r'^([a-z][a-z0-9+.-]*)://([^/?#]*)(.*)$')
+    HOST_REGEX = re.compile(r'^(?:\[[0-9a-f:]+\]|[a-z0-9-]+(?:\.[a-z0-9-]+)+)(?::\d+)?$')
+    IPV4_REGEX = re.compile(r'^\d{1,3}(?:\.\d{1,3}){3}$')
+    # 以这些字符结尾的URL条目视为前缀规则，保留子串匹配
+    PREFIX_ENDINGS = ('=', '?', '&', '/')
+
+    def __init__(self,
+                 urls: Iterable[str] = (),
+                 hosts: Iterable[str] = (),
+                 keywords: Iterable[str] = ()):
+        self.urls: FrozenSet[str] = frozenset(urls)
+        self.hosts: FrozenSet[str] = frozenset(hosts)
+        self.keywords: FrozenSet[str] = frozenset(keywords)
+        self.keyword_matcher = BlacklistMatcher(self.keywords)
+
+        # 规范URL去掉查询参数后的部分 -> 各条目要求的查询参数集合
+        self._url_index: Dict[str, List[FrozenSet[str]]] = {}
+        for url in self.urls:
+            base, _, query = url.partition('?')
+            self._url_index.setdefault(base, []).append(frozenset(query.split('&')) if query else frozenset())
+
+    def __len__(self) -> int:
+        return len(self.urls) + len(self.hosts) + len(self.keywords)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    @classmethod
+    def classify_entry(cls, entry: str) -> Tuple[str, str]:
+        """将单条（已转小写）黑名单条目归类为 url/host/keyword"""
+        if match := cls.URL_REGEX.match(entry):
+            netloc, tail = match.group(2), match.group(3)
+            if tail in ('', '/'):
+                if cls.HOST_REGEX.match(netloc):
+                    return 'host', netloc
+                return 'keyword', entry
+            if entry.endswith(cls.PREFIX_ENDINGS) or any(c.isspace() or c == '"' for c in entry):
+                return 'keyword', entry
+            if (url := cls.canonical(entry)) is None:
+                return 'keyword', entry
+            return 'url', url
+        if cls.HOST_REGEX.match(entry):
+            return 'host', entry
+        return 'keyword', entry
+
+    @staticmethod
+    def canonical(url: str) -> Optional[str]:
+        """URL规范形式（无法解析时返回None）"""
+        try:
+            return canonical_url(urlsplit(url))
+        except ValueError:
+            return None
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[str]) -> 'BlacklistIndex':
+        """从名单条目构建分层索引"""
+        tiers: Dict[str, set] = {'url': set(), 'host': set(), 'keyword': set()}
+        for entry in entries:
+            entry = entry.strip().lower()
+            if not entry or entry.startswith('#'):
+                continue
+            tier, key = cls.classify_entry(entry)
+            tiers[tier].add(key)
+        return cls(tiers['url'], tiers['host'], tiers['keyword'])
+
+    @classmethod
+    def load(cls, path: str, cache_dir: Optional[str] = None) -> 'BlacklistIndex':
+        """
+        加载黑名单文件（按文件内容哈希缓存分层结果）
+
+        参数:
+            path: 黑名单文件路径
+            cache_dir: 缓存目录，为空时不使用磁盘缓存
+        """
+        file = Path(path)
+        if not file.exists():
+            return cls()
+
+        key = (cls.FORMAT_VERSION, file_digest(file))
+        cache_file = Path(cache_dir) / 'blacklist_index.pkl' if cache_dir else None
+        if cache_file and (tiers := read_cache(cache_file, key)) is not None:
+            logger.debug(f"黑名单索引命中缓存: {cache_file}")
+            return cls(*tiers)
+
+        with open(file, 'r', encoding='utf-8') as f:
+            index = cls.from_entries(line for line in f if not line.startswith('#'))
+
+        if cache_file:
+            write_cache(cache_file, key, (index.urls, index.hosts, index.keywords))
+        return index
+
+    def _match_host(self, netloc: str) -> bool:
+        """主机层匹配：host:port 精确匹配，域名按后缀逐级匹配"""
+        netloc = netloc.rsplit('@', 1)[-1]
+        if netloc in self.hosts:
+            return True
+        host = netloc.split(']')[0] + ']' if netloc.startswith('[') else netloc.split(':')[0]
+        if host in self.hosts:
+            return True
+        if self.IPV4_REGEX.match(host):
+            return False
+        dot = host.find('.')
+        while dot != -1:
+            host = host[dot + 1:]
+            if host in self.hosts:
+                return True
+            dot = host.find('.')
+        return False
+
+    def _match_url(self, url: str) -> bool:
+        """URL层匹配：规范URL的基础部分相同，且条目的查询参数均出现在频道URL中"""
+        if (canonical := self.canonical(url)) is None:
+            return False
+        base, _, query = canonical.partition('?')
+        required = self._url_index.get(base)
+        if required is None:
+            return False
+        params = frozenset(query.split('&')) if query else frozenset()
+        return any(pairs <= params for pairs in required)
+
+    def is_blacklisted(self, channel: Channel) -> bool:
+        """检查频道是否命中任一层黑名单"""
+        return self.match(channel.name, channel.url)
+
+    def match(self, name: str, url: str) -> bool:
+        """检查名称/URL是否命中任一层黑名单（供列式存储按列调用）"""
+        lowered = url.strip().lower()
+        if self._url_index and self._match_url(lowered):
+            return True
+        if self.hosts and (match := self.URL_REGEX.match(lowered)) and self._match_host(match.group(2)):
+            return True
+        return self.keyword_matcher.match(name, url)
+
+    def stats(self) -> Dict[str, int]:
+        """各层条目数量"""
+        return {'url': len(self.urls), 'host': len(self.hosts), 'keyword': len(self.keywords)}
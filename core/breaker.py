@@ -0,0 +1,79 @@
+import time
+import logging
+from typing import Dict, Set
+
+logger = logging.getLogger(__name__)
+
+class CircuitBreaker:
+    """
+    按连接端点（host:port）熔断
+
+    - 关闭：正常放行，连续连接失败/超时达到阈值后打开
+    - 打开：冷却期内该端点的频道直接跳过
+    - 半开：冷却期结束后只放行一个探测请求，成功则关闭，失败则重新打开
+    """
+
+    def __init__(self, threshold: int = 3, cooldown: float = 60.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+        self._probing: Set[str] = set()
+        self.trips = 0
+        self.skipped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold > 0
+
+    @property
+    def open_count(self) -> int:
+        """当前处于打开/半开状态的端点数"""
+        return len(self._opened_at)
+
+    def allow(self, endpoint: str) -> bool:
+        """是否放行该端点的请求（拒绝时计入跳过数）"""
+        opened_at = self._opened_at.get(endpoint)
+        if opened_at is None:
+            return True
+        if endpoint not in self._probing and time.monotonic() - opened_at >= self.cooldown:
+            self._probing.add(endpoint)
+            return True
+        self.skipped += 1
+        return False
+
+    def record_success(self, endpoint: str) -> None:
+        """端点有响应（无论状态码与速度），重置失败计数并关闭熔断"""
+        self._failures.pop(endpoint, None)
+        if self._opened_at.pop(endpoint, None) is not None:
+            self._probing.discard(endpoint)
+            logger.debug(f"熔断恢复: {endpoint}")
+
+    def record_failure(self, endpoint: str) -> None:
+        """记录一次连接失败/超时"""
+        if not self.enabled:
+            return
+        if endpoint in self._probing:
+            # 半开探测失败，重新进入冷却
+            self._probing.discard(endpoint)
+            self._opened_at[endpoint] = time.monotonic()
+            return
+        if endpoint in self._opened_at:
+            return
+        failures = self._failures.get(endpoint, 0) + 1
+        self._failures[endpoint] = failures
+        if failures >= self.threshold:
+            self._opened_at[endpoint] = time.monotonic()
+            self.trips += 1
+            logger.debug(f"熔断打开: {endpoint} (连续失败{failures}次)")
+
+    def release_probe(self, endpoint: str) -> None:
+        """半开探测既无法判定成功也无法判定失败（如内部异常）时释放探测名额，下一个请求重新探测"""
+        self._probing.discard(endpoint)
+
+    def clear(self) -> None:
+        self._failures.clear()
+        self._opened_at.clear()
+        self._probing.clear()
+        self.trips = 0
+        self.skipped = 0
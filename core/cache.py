@@ -0,0 +1,42 @@
+import os
+import pickle
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# 缓存格式版本（结构变化时递增，旧缓存自动失效）
+CACHE_VERSION = 1
+
+def file_digest(path: Union[str, Path]) -> str:
+    """计算文件内容哈希（不依赖mtime，CI检出后仍可命中缓存）"""
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def read_cache(path: Union[str, Path], key: Any) -> Optional[Any]:
+    """读取缓存文件，键不匹配或文件损坏时返回None"""
+    file = Path(path)
+    if not file.exists():
+        return None
+    try:
+        with open(file, 'rb') as f:
+            payload = pickle.load(f)
+        if payload.get('version') == CACHE_VERSION and payload.get('key') == key:
+            return payload['data']
+    except Exception as e:
+        logger.warning(f"缓存读取失败，将重新生成: {file} ({str(e)})")
+    return None
+
+def write_cache(path: Union[str, Path], key: Any, data: Any) -> None:
+    """原子写入缓存文件（先写临时文件再替换）"""
+    file = Path(path)
+    try:
+        file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = file.with_suffix(file.suffix + '.tmp')
+        with open(tmp_file, 'wb') as f:
+            pickle.dump({'version': CACHE_VERSION, 'key': key, 'data': data}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, file)
+    except Exception as e:
+        logger.warning(f"缓存写入失败: {file} ({str(e)})")
@@ -0,0 +1,412 @@
+import os
+import hmac
+import time
+import socket
+import asyncio
+import logging
+import secrets
+import argparse
+import multiprocessing
+from collections import deque
+from configparser import ConfigParser
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+import aiohttp
+from aiohttp import web
+from .models import Channel
+from .tester import SpeedTester
+from .resolver import CachingResolver
+
+logger = logging.getLogger(__name__)
+
+# 协调器与工作节点之间的认证请求头
+TOKEN_HEADER = 'X-Test-Token'
+
+class Shard:
+    """协调器中的一个分片：未完成的频道下标与当前租约"""
+    __slots__ = ['shard_id', 'pending', 'attempts', 'lease', 'worker', 'deadline']
+
+    def __init__(self, shard_id: int, indexes: List[int]):
+        self.shard_id = shard_id
+        self.pending: Set[int] = set(indexes)
+        self.attempts = 0
+        self.lease: Optional[str] = None
+        self.worker = ""
+        self.deadline = 0.0
+
+
+class TestCoordinator:
+    """
+    分布式测速协调器
+
+    频道按主机分组后切成约shard_size个频道的分片，通过HTTP分发给工作节点：
+    - POST /lease：领取分片（频道列表与测速配置），暂无可领取分片时返回等待，全部完成后返回结束
+    - POST /results：回传一批结果并续约，最后一次携带统计并标记完成
+    租约超过lease_timeout秒未续约视为工作节点丢失，分片中未完成的频道重新排队；
+    同一分片最多分发max_leases次，之后剩余频道判定离线。
+    """
+
+    def __init__(self,
+                 tester: SpeedTester,
+                 host: str = '127.0.0.1',
+                 port: int = 8765,
+                 token: str = '',
+                 shard_size: int = 500,
+                 lease_timeout: float = 60.0,
+                 max_leases: int = 3,
+                 wait_timeout: float = 300.0,
+                 local_workers: int = 0,
+                 worker_processes: int = 0):
+        self.tester = tester
+        self.host = host
+        self.port = port
+        self.token = token
+        self.shard_size = max(1, shard_size)
+        self.lease_timeout = max(1.0, lease_timeout)
+        self.max_leases = max(1, max_leases)
+        self.wait_timeout = wait_timeout
+        self.local_workers = max(0, local_workers)
+        self.worker_processes = worker_processes
+
+        self._channels: List[Channel] = []
+        self._shards: Dict[int, Shard] = {}
+        self._waiting: Deque[int] = deque()
+        self._finished = asyncio.Event()
+        self._last_activity = 0.0
+        self._progress_cb: Callable = lambda _: None
+        self._failed_urls: Set[str] = set()
+        self._white_list: List[str] = []
+        self._settings: Dict[str, Any] = {}
+
+        self.workers: Set[str] = set()
+        self.leases_granted = 0
+        self.leases_expired = 0
+        self.shards_failed = 0
+
+    async def run(self,
+                  channels: List[Channel],
+                  progress_cb: Optional[Callable] = None,
+                  failed_urls: Optional[Set[str]] = None,
+                  white_list: Optional[Set[str]] = None) -> None:
+        """启动协调服务，等待所有分片完成（结果直接写回channels）"""
+        self._channels = channels
+        self._progress_cb = progress_cb or (lambda _: None)
+        self._failed_urls = failed_urls if failed_urls is not None else set()
+        self._white_list = sorted(white_list or ())
+        tester_args, options = self.tester.worker_settings(self.worker_processes)
+        options.pop('DISTRIBUTED', None)
+        self._settings = {'tester_args': tester_args, 'options': options}
+
+        # 同一协调器可多次运行：丢弃上一次运行的分片，避免按旧分片号分发新频道列表
+        self._shards.clear()
+        self._waiting.clear()
+        shard_count = -(-len(channels) // self.shard_size)
+        for shard_id, indexes in enumerate(SpeedTester.partition_by_host(channels, shard_count)):
+            self._shards[shard_id] = Shard(shard_id, indexes)
+            self._waiting.append(shard_id)
+        self._finished.clear()
+        if not self._shards:
+            return
+
+        self.tester.total_count = 0
+        self.tester.success_count = 0
+        self.tester.start_time = time.time()
+        self._last_activity = time.monotonic()
+
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post('/lease', self._handle_lease)
+        app.router.add_post('/results', self._handle_results)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, self.host, self.port)
+        await site.start()
+        port = runner.addresses[0][1]
+        if not self.token and self.host not in ('127.0.0.1', 'localhost', '::1'):
+            logger.warning("⚠️ 协调器监听非本机地址但未设置令牌，任何人都可领取分片")
+        logger.info(
+            f"🛰️ 分布式测速协调器已启动 | 监听: {self.host}:{port} | 频道: {len(channels)} | "
+            f"分片: {len(self._shards)} | 本地工作节点: {self.local_workers}"
+        )
+
+        processes = self._start_local_workers(port)
+        reaper = asyncio.create_task(self._reap_leases())
+        try:
+            await self._finished.wait()
+        finally:
+            reaper.cancel()
+            await runner.cleanup()
+            # 所有分片已完成，本地工作节点只剩轮询，直接结束
+            for process in processes:
+                process.terminate()
+                process.join()
+
+    def summary(self) -> str:
+        return (
+            f"工作节点: {len(self.workers)} | 分片: {len(self._shards)} | 租约: {self.leases_granted} | "
+            f"超时重派: {self.leases_expired} | 放弃分片: {self.shards_failed}"
+        )
+
+    def _start_local_workers(self, port: int) -> List[multiprocessing.Process]:
+        """在本机启动工作节点进程（单机测试或与远程节点配合使用）"""
+        host = '127.0.0.1' if self.host in ('', '0.0.0.0', '::') else self.host
+        url = f"http://{host}:{port}"
+        context = multiprocessing.get_context('spawn')
+        processes = []
+        for i in range(self.local_workers):
+            process = context.Process(
+                target=_run_local_worker,
+                args=(url, self.token, f"{socket.gethostname()}-local{i}")
+            )
+            process.start()
+            processes.append(process)
+        return processes
+
+    async def _read_request(self, request: web.Request) -> Dict[str, Any]:
+        """校验令牌并读取JSON请求体"""
+        if self.token and not hmac.compare_digest(request.headers.get(TOKEN_HEADER, ''), self.token):
+            raise web.HTTPUnauthorized(text="令牌错误")
+        try:
+            return await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest(text="请求格式错误")
+
+    async def _handle_lease(self, request: web.Request) -> web.Response:
+        """分发一个分片（租约）"""
+        body = await self._read_request(request)
+        worker = str(body.get('worker') or request.remote)
+        self.workers.add(worker)
+        self._last_activity = time.monotonic()
+
+        while self._waiting:
+            shard = self._shards[self._waiting.popleft()]
+            if not shard.pending:
+                continue
+            shard.attempts += 1
+            shard.lease = secrets.token_hex(8)
+            shard.worker = worker
+            shard.deadline = time.monotonic() + self.lease_timeout
+            self.leases_granted += 1
+            logger.debug(f"分发分片{shard.shard_id} -> {worker} | 频道: {len(shard.pending)} | 第{shard.attempts}次")
+            return web.json_response({
+                'shard': shard.shard_id,
+                'lease': shard.lease,
+                'lease_timeout': self.lease_timeout,
+                'items': [[index, self._channels[index].name, self._channels[index].url] for index in sorted(shard.pending)],
+                'white_list': self._white_list,
+                **self._settings,
+            })
+
+        if self._finished.is_set():
+            return web.json_response({'done': True})
+        # 其余分片仍在测试中（租约超时后可能重新排队），稍后再来
+        return web.json_response({'wait': min(5.0, self.lease_timeout / 4)})
+
+    async def _handle_results(self, request: web.Request) -> web.Response:
+        """接收一批结果并续约；done为真时合并统计并结束租约"""
+        body = await self._read_request(request)
+        shard = self._shards.get(body.get('shard'))
+        if shard is None or shard.lease is None or shard.lease != body.get('lease'):
+            return web.json_response({'error': "租约已失效"}, status=409)
+
+        self._last_activity = time.monotonic()
+        shard.deadline = self._last_activity + self.lease_timeout
+        self.tester.apply_shard_results(
+            self._channels, [tuple(result) for result in body.get('results', ())],
+            shard.pending, self._progress_cb, self._failed_urls
+        )
+        if body.get('done'):
+            if body.get('stats'):
+                self.tester.merge_shard_stats(shard.shard_id, body['stats'])
+            shard.lease = None
+            if shard.pending:
+                # 工作节点异常结束，剩余频道按租约超时处理
+                self._release(shard, f"分片{shard.shard_id}未完成即结束 ({shard.worker})")
+            self._check_finished()
+        return web.json_response({'ok': True})
+
+    async def _reap_leases(self) -> None:
+        """定期回收超时租约；长时间没有工作节点领取分片时放弃剩余分片"""
+        interval = min(1.0, self.lease_timeout / 4)
+        while not self._finished.is_set():
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            leased = False
+            for shard in self._shards.values():
+                if shard.lease is None:
+                    continue
+                if now < shard.deadline:
+                    leased = True
+                    continue
+                shard.lease = None
+                self.leases_expired += 1
+                self._release(shard, f"租约超时: 分片{shard.shard_id} ({shard.worker})")
+
+            if not leased and self._waiting and now - self._last_activity > self.wait_timeout:
+                logger.error(f"等待工作节点超时（{self.wait_timeout:.0f}秒），剩余分片判定离线")
+                while self._waiting:
+                    self._fail(self._shards[self._waiting.popleft()])
+            self._check_finished()
+
+    def _release(self, shard: Shard, reason: str) -> None:
+        """租约失效：未达到分发次数上限时重新排队，否则剩余频道判定离线"""
+        if shard.attempts < self.max_leases:
+            logger.warning(f"⚠️ {reason} | 未完成: {len(shard.pending)} | 重新排队")
+            self._waiting.append(shard.shard_id)
+        else:
+            logger.warning(f"⚠️ {reason} | 已分发{shard.attempts}次，剩余{len(shard.pending)}个频道判定离线")
+            self._fail(shard)
+
+    def _fail(self, shard: Shard) -> None:
+        self.shards_failed += 1
+        self.tester.fail_shard(self._channels, shard.pending, self._progress_cb, self._failed_urls)
+
+    def _check_finished(self) -> None:
+        if all(not shard.pending for shard in self._shards.values()):
+            self._finished.set()
+
+
+async def run_worker(coordinator: str,
+                     token: str = '',
+                     name: str = '',
+                     processes: Optional[int] = None,
+                     retry_window: float = 30.0) -> int:
+    """
+    工作节点：循环领取分片测速并回传结果
+    协调器返回结束、令牌错误或连续retry_window秒无法连接时退出；返回测试的频道数
+    """
+    base = coordinator.rstrip('/')
+    name = name or f"{socket.gethostname()}-{os.getpid()}"
+    tested = 0
+    unreachable_since: Optional[float] = None
+
+    async with aiohttp.ClientSession(
+        headers={TOKEN_HEADER: token},
+        timeout=aiohttp.ClientTimeout(total=60)
+    ) as session:
+        while True:
+            try:
+                async with session.post(f"{base}/lease", json={'worker': name}) as response:
+                    if response.status == 401:
+                        logger.error(f"协调器拒绝访问（令牌错误）: {base}")
+                        break
+                    response.raise_for_status()
+                    lease = await response.json()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                now = time.monotonic()
+                unreachable_since = unreachable_since or now
+                if now - unreachable_since >= retry_window:
+                    logger.warning(f"无法连接协调器，工作节点退出: {base} ({str(e)})")
+                    break
+                await asyncio.sleep(2)
+                continue
+
+            unreachable_since = None
+            if lease.get('done'):
+                break
+            if 'wait' in lease:
+                await asyncio.sleep(lease['wait'])
+                continue
+            tested += await _test_lease(session, base, lease, processes, retry_window)
+    return tested
+
+
+async def _test_lease(session: aiohttp.ClientSession,
+                      base: str,
+                      lease: Dict[str, Any],
+                      processes: Optional[int],
+                      retry_window: float) -> int:
+    """测试一个分片：测速期间定期回传结果（兼作续约），租约失效时放弃该分片"""
+    config = ConfigParser()
+    config.read_dict(lease['options'])
+    if processes is not None:
+        config['PERFORMANCE']['test_processes'] = str(processes)
+    resolver = None
+    if config.getboolean('PERFORMANCE', 'enable_dns_cache', fallback=True):
+        resolver = CachingResolver(
+            ttl=config.getfloat('PERFORMANCE', 'dns_cache_ttl', fallback=3600),
+            negative_ttl=config.getfloat('PERFORMANCE', 'dns_negative_ttl', fallback=300)
+        )
+    tester = SpeedTester(enable_logging=False, config=config, resolver=resolver, **lease['tester_args'])
+
+    items = lease['items']
+    channels = [Channel(name=name, url=url) for _, name, url in items]
+    positions = {id(channel): index for channel, (index, _, _) in zip(channels, items)}
+    buffer: List[List[Any]] = []
+
+    def collect(channel: Channel) -> None:
+        buffer.append([positions[id(channel)], channel.status, channel.response_time, channel.download_speed])
+
+    async def report(done: bool = False) -> bool:
+        """回传缓冲中的结果（连接失败时保留结果稍后重试），租约失效时返回False"""
+        batch = buffer[:]
+        payload = {'shard': lease['shard'], 'lease': lease['lease'], 'results': batch}
+        if done:
+            payload.update(done=True, stats=tester.shard_stats())
+        async with session.post(f"{base}/results", json=payload) as response:
+            if response.status == 409:
+                return False
+            response.raise_for_status()
+        del buffer[:len(batch)]
+        return True
+
+    logger.info(f"领取分片{lease['shard']} | 频道: {len(channels)}")
+    test = asyncio.create_task(tester.test_channels(channels, None, set(), set(lease['white_list']), collect))
+    interval = max(0.5, min(5.0, lease['lease_timeout'] / 4))
+    try:
+        while not test.done():
+            await asyncio.wait({test}, timeout=interval)
+            try:
+                if not await report():
+                    logger.warning(f"分片{lease['shard']}租约已失效，放弃该分片")
+                    return 0
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f"回传结果失败，稍后重试: {str(e)}")
+
+        if test.exception():
+            logger.error(f"分片{lease['shard']}测速异常: {str(test.exception())}")
+        deadline = time.monotonic() + retry_window
+        while True:
+            try:
+                if not await report(done=True):
+                    logger.warning(f"分片{lease['shard']}租约已失效，结果未被采用")
+                    return 0
+                logger.info(f"分片{lease['shard']}完成 | 成功: {tester.success_count}/{len(channels)}")
+                return len(channels)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if time.monotonic() >= deadline:
+                    logger.warning(f"分片{lease['shard']}结果回传失败: {str(e)}")
+                    return 0
+                await asyncio.sleep(2)
+    finally:
+        if not test.done():
+            test.cancel()
+            await asyncio.gather(test, return_exceptions=True)
+        if resolver:
+            await resolver.close()
+
+
+def _run_local_worker(coordinator: str, token: str, name: str) -> None:
+    """本地工作节点进程入口"""
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run_worker(coordinator, token, name, retry_window=5))
+
+
+def worker_main() -> None:
+    """工作节点命令行入口（worker.py）"""
+    parser = argparse.ArgumentParser(description="分布式测速工作节点")
+    parser.add_argument('coordinator', help="协调器地址，如 http://192.168.1.10:8765")
+    parser.add_argument('--token', default=os.environ.get('IPTV_TEST_TOKEN', ''),
+                        help="协调器令牌（默认读取环境变量IPTV_TEST_TOKEN）")
+    parser.add_argument('--name', default='', help="工作节点名称（默认为主机名-进程号）")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="本节点分片测速进程数（默认使用协调器的worker_processes配置）")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    if os.name == 'nt':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    tested = asyncio.run(run_worker(args.coordinator, args.token, args.name, args.processes))
+    logger.info(f"工作节点退出 | 测试频道: {tested}")
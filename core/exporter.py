@@ -110,9 +110,11 @@ class ResultExporter:
             logger.error(f"未分类频道导出失败: {str(e)}", exc_info=True)
 
     def _classify_channels(self, channels: List[Channel]) -> Tuple[List[Channel], List[Channel]]:
-        """分类频道为IPv4/IPv6（已跳过未分类频道）"""
-        ipv4_channels = [c for c in channels if c.status == 'online' and Channel.classify_ip_type(c.url) != "ipv6"]
-        ipv6_channels = [c for c in channels if c.status == 'online' and Channel.classify_ip_type(c.url) == "ipv6"]
+        """分类频道为IPv4/IPv6（已跳过未分类频道，直接读取预解析的IP类型）"""
+        ipv4_channels, ipv6_channels = [], []
+        for c in channels:
+            if c.status == 'online':
+                (ipv6_channels if c.info.ipv6 else ipv4_channels).append(c)
         return ipv4_channels, ipv6_channels
 
     def _export_all(self, channels: List[Channel]) -> None:
@@ -181,18 +183,8 @@ class ResultExporter:
             logger.warning(f"写入频道失败 {channel.name}: {str(e)}")
 
     def _get_template_order(self) -> List[str]:
-        """获取模板中的分类顺序"""
-        try:
-            order = []
-            with open(self.template_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line.endswith(',#genre#'):
-                        category = line.split(',')[0]
-                        order.append(category)
-            return order
-        except Exception:
-            return []
+        """获取模板中的分类顺序（复用分类器已编译的模板，不再重复读取模板文件）"""
+        return self.matcher.template.category_order
 
     def _export_txt(self, channels: List[Channel], file_path: Path) -> int:
         """TXT格式导出（兼容传统播放器）"""
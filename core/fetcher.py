@@ -1,29 +1,54 @@
 import aiohttp
 import asyncio
 import logging
-from typing import List, Callable
+import codecs
+import os
+from typing import List, Callable, Dict, Optional, AsyncGenerator, Iterator
 import re
-from functools import lru_cache
+import hashlib
+from pathlib import Path
+from .cache import read_cache, write_cache
+from .models import Channel
 
 logger = logging.getLogger(__name__)
 
 class SourceFetcher:
     """订阅源获取器（带大小检查和智能重试）"""
-    
-    def __init__(self, timeout: float, concurrency: int, retries: int = 2, config=None):
+
+    # 编码检测采样大小（无需对整个内容多次试解码）
+    ENCODING_SAMPLE_SIZE = 64 * 1024
+
+    def __init__(self, timeout: float, concurrency: int, retries: int = 2, config=None, resolver=None):
         self.timeout = aiohttp.ClientTimeout(total=timeout)
         self.semaphore = asyncio.Semaphore(concurrency)
         self.retries = retries
         self.config = config or {}
+        # 共享DNS解析器（为空时使用aiohttp默认解析器）
+        self.resolver = resolver
         self.common_encodings = ['utf-8', 'gbk', 'latin-1']
         self.max_size = int(self.config.get('FETCHER', 'max_source_size', fallback=50 * 1024 * 1024))
 
+        # 流式模式配置
+        self.stream_chunk_size = self.config.getint('FETCHER', 'stream_chunk_size', fallback=64 * 1024)
+        self.stream_queue_size = self.config.getint('FETCHER', 'stream_queue_size', fallback=5000)
+
+        # 条件请求缓存（ETag/Last-Modified）
+        self.cache_dir = None
+        if self.config.getboolean('FETCHER', 'enable_cache', fallback=True):
+            self.cache_dir = Path(self.config.get('PATHS', 'cache_dir', fallback='cache')) / 'sources'
+        self.not_modified_count = 0
+
     async def fetch_all(self, urls: List[str], progress_cb: Callable) -> List[str]:
         """批量获取订阅源（带并发控制）"""
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
+        async with self._session() as session:
             tasks = [self._fetch_with_retry(session, url, progress_cb) for url in urls]
             return await asyncio.gather(*tasks)
 
+    def _session(self) -> aiohttp.ClientSession:
+        """创建会话（配置了共享解析器时使用自定义connector）"""
+        connector = aiohttp.TCPConnector(resolver=self.resolver) if self.resolver else None
+        return aiohttp.ClientSession(timeout=self.timeout, connector=connector)
+
     async def _fetch_with_retry(self, session: aiohttp.ClientSession, url: str, progress_cb: Callable) -> str:
         """带重试机制的请求处理"""
         for attempt in range(self.retries + 1):
@@ -39,39 +64,217 @@ class SourceFetcher:
             finally:
                 progress_cb()
 
+    def _cache_paths(self, url: str):
+        """订阅源缓存文件路径：(校验头元数据, 内容文本)"""
+        name = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return self.cache_dir / f"{name}.pkl", self.cache_dir / f"{name}.txt"
+
+    async def _load_cached(self, url: str) -> Optional[Dict[str, str]]:
+        """读取订阅源缓存元数据（内容文件缺失时视为无缓存）"""
+        if not self.cache_dir:
+            return None
+        meta_path, body_path = self._cache_paths(url)
+        loop = asyncio.get_running_loop()
+        cached = await loop.run_in_executor(None, read_cache, meta_path, url)
+        return cached if cached and body_path.exists() else None
+
+    def _conditional_headers(self, cached: Optional[Dict[str, str]]) -> Dict[str, str]:
+        """构造请求头（有缓存时附带条件请求头）"""
+        headers = {'User-Agent': 'Mozilla/5.0'}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+        return headers
+
+    def _cache_meta(self, resp: aiohttp.ClientResponse) -> Optional[Dict[str, str]]:
+        """提取响应校验头，无ETag/Last-Modified或未启用缓存时返回None"""
+        etag = resp.headers.get('ETag')
+        last_modified = resp.headers.get('Last-Modified')
+        if not self.cache_dir or not (etag or last_modified):
+            return None
+        return {'etag': etag, 'last_modified': last_modified}
+
+    def _write_body(self, url: str, meta: Dict[str, str], body: str) -> None:
+        """保存订阅源内容及校验头"""
+        meta_path, body_path = self._cache_paths(url)
+        body_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = body_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8', errors='surrogatepass') as f:
+            f.write(body)
+        os.replace(tmp_path, body_path)
+        write_cache(meta_path, url, meta)
+
+    def _read_body(self, url: str) -> str:
+        """读取缓存的订阅源内容"""
+        _, body_path = self._cache_paths(url)
+        with open(body_path, 'r', encoding='utf-8', errors='surrogatepass') as f:
+            return f.read()
+
     async def _fetch(self, session: aiohttp.ClientSession, url: str) -> str:
-        """执行单次请求（带大小检查）"""
+        """执行单次请求（带大小检查和条件请求）"""
         async with self.semaphore:
-            headers = {'User-Agent': 'Mozilla/5.0'}
+            cached = await self._load_cached(url)
+            headers = self._conditional_headers(cached)
             async with session.get(url, headers=headers) as resp:
+                loop = asyncio.get_running_loop()
+
+                # 未修改：直接复用缓存内容
+                if resp.status == 304 and cached:
+                    self.not_modified_count += 1
+                    logger.debug(f"订阅源未修改，使用缓存: {url}")
+                    return await loop.run_in_executor(None, self._read_body, url)
+
                 # 检查状态码
                 if resp.status != 200:
                     raise ValueError(f"HTTP status {resp.status}")
-                
+
                 # 处理内容编码
                 raw_content = await resp.read()
-                
+
                 # 检查实际下载大小
                 if len(raw_content) > self.max_size:
                     raise ValueError(
                         f"Content too large ({len(raw_content)/1024/1024:.1f}MB > {self.max_size/1024/1024:.1f}MB)"
                     )
-                
+
                 encoding = self._detect_encoding(resp.headers.get('Content-Type', ''), raw_content)
-                return raw_content.decode(encoding, errors='replace')
+                body = raw_content.decode(encoding, errors='replace')
+                if meta := self._cache_meta(resp):
+                    await loop.run_in_executor(None, self._write_body, url, meta, body)
+                return body
+
+    async def stream_channels(self, urls: List[str], parser, progress_cb: Callable) -> AsyncGenerator[Channel, None]:
+        """
+        流式获取并解析所有订阅源（边下载边解析）
+
+        各订阅源并发下载，按数据块增量解码后逐行送入解析器，
+        解析出的频道经有界队列输出，内存占用与订阅源大小无关。
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.stream_queue_size)
+        done = object()
+
+        async with self._session() as session:
+            async def produce(url: str) -> None:
+                try:
+                    async for channel in self._stream_with_retry(session, url, parser):
+                        await queue.put(channel)
+                finally:
+                    progress_cb()
+                    await queue.put(done)
+
+            tasks = [asyncio.create_task(produce(url)) for url in urls]
+            try:
+                remaining = len(tasks)
+                while remaining:
+                    item = await queue.get()
+                    if item is done:
+                        remaining -= 1
+                    else:
+                        yield item
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _stream_with_retry(self, session: aiohttp.ClientSession, url: str, parser) -> AsyncGenerator[Channel, None]:
+        """流式解析单个订阅源（仅在尚未输出任何频道时重试，避免重复）"""
+        for attempt in range(self.retries + 1):
+            emitted = 0
+            try:
+                async for channel in parser.parse_stream(self._stream_lines(session, url)):
+                    emitted += 1
+                    yield channel
+                return
+            except Exception as e:
+                logger.warning(f"Attempt {attempt+1}/{self.retries+1} failed: {url} - {str(e)}")
+                if emitted or attempt == self.retries:
+                    return
+                await asyncio.sleep(1 + attempt)
+
+    async def _stream_lines(self, session: aiohttp.ClientSession, url: str) -> AsyncGenerator[str, None]:
+        """逐行输出订阅源内容（增量解码，未修改时读取缓存文件）"""
+        async with self.semaphore:
+            cached = await self._load_cached(url)
+            headers = self._conditional_headers(cached)
+            async with session.get(url, headers=headers) as resp:
+                if resp.status == 304 and cached:
+                    self.not_modified_count += 1
+                    logger.debug(f"订阅源未修改，使用缓存: {url}")
+                    for line in self._iter_cached_lines(url):
+                        yield line
+                    return
+
+                if resp.status != 200:
+                    raise ValueError(f"HTTP status {resp.status}")
+
+                meta = self._cache_meta(resp)
+                cache_file = None
+                if meta:
+                    _, body_path = self._cache_paths(url)
+                    body_path.parent.mkdir(parents=True, exist_ok=True)
+                    cache_file = open(body_path.with_suffix('.tmp'), 'w', encoding='utf-8', errors='surrogatepass')
+
+                try:
+                    content_type = resp.headers.get('Content-Type', '')
+                    decoder = None
+                    buffer = ''
+                    size = 0
+                    async for chunk in resp.content.iter_chunked(self.stream_chunk_size):
+                        size += len(chunk)
+                        if size > self.max_size:
+                            raise ValueError(
+                                f"Content too large (>{self.max_size/1024/1024:.1f}MB)"
+                            )
+                        if decoder is None:
+                            encoding = self._detect_encoding(content_type, chunk)
+                            decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+                        text = decoder.decode(chunk)
+                        if cache_file:
+                            cache_file.write(text)
+                        *lines, buffer = (buffer + text).split('\n')
+                        for line in lines:
+                            yield line
+
+                    if decoder:
+                        text = decoder.decode(b'', final=True)
+                        if cache_file:
+                            cache_file.write(text)
+                        buffer += text
+                    for line in buffer.splitlines():
+                        yield line
+                except BaseException:
+                    if cache_file:
+                        cache_file.close()
+                        os.unlink(cache_file.name)
+                    raise
+
+                if cache_file:
+                    cache_file.close()
+                    os.replace(cache_file.name, body_path)
+                    write_cache(self._cache_paths(url)[0], url, meta)
+
+    def _iter_cached_lines(self, url: str) -> Iterator[str]:
+        """逐行读取缓存的订阅源内容"""
+        _, body_path = self._cache_paths(url)
+        with open(body_path, 'r', encoding='utf-8', errors='surrogatepass') as f:
+            for line in f:
+                yield line.rstrip('\r\n')
 
-    @lru_cache(maxsize=128)
     def _detect_encoding(self, content_type: str, raw_content: bytes) -> str:
-        """检测内容编码（带缓存）"""
+        """检测内容编码（仅对开头部分试解码）"""
         if 'charset=' in content_type:
             if match := re.search(r'charset=([\w-]+)', content_type, re.IGNORECASE):
                 return match.group(1).lower()
-        
+
+        sample = raw_content[:self.ENCODING_SAMPLE_SIZE]
         for enc in self.common_encodings:
             try:
-                raw_content.decode(enc)
+                # 非final模式：允许采样末尾出现被截断的多字节字符
+                codecs.getincrementaldecoder(enc)().decode(sample, final=False)
                 return enc
             except UnicodeDecodeError:
                 continue
-        
-        return 'utf-8'
\ No newline at end of file
+
+        return 'utf-8'
@@ -0,0 +1,82 @@
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+# 比较前去除的内容：括号内的分辨率/备注（如 "(1080p)"、"[Not 24/7]"）、空白与标点
+_BRACKETED = re.compile(r'[\(\[（【][^\)\]）】]*[\)\]）】]')
+_NON_WORD = re.compile(r'[\W_]+')
+_DIGITS = re.compile(r'\d+')
+# 名称末尾可忽略的后缀（"湖南卫视台"、"金鹰纪实频道"）
+NOISE_SUFFIXES = ('电视台', '频道', '台')
+
+def fuzzy_key(name: str) -> str:
+    """模糊比较用的名称形式：小写，去除括号备注、空白标点及末尾的"频道"/"台"等后缀"""
+    key = _NON_WORD.sub('', _BRACKETED.sub('', name).lower())
+    for suffix in NOISE_SUFFIXES:
+        if key.endswith(suffix) and len(key) > len(suffix) + 1:
+            return key[:-len(suffix)]
+    return key
+
+
+class NgramIndex:
+    """
+    字符n-gram倒排索引（模糊匹配）
+
+    每个条目按 fuzzy_key 切分为字符n-gram（首尾补边界符），lookup() 只对与查询共享n-gram的条目计分，
+    相似度为n-gram集合的Dice系数；名称中的数字必须完全一致（避免 CCTV1 命中 CCTV12）。
+    """
+
+    def __init__(self, n: int = 2):
+        self.n = n
+        self._postings: Dict[str, List[int]] = defaultdict(list)
+        self._sizes: List[int] = []
+        self._digits: List[Tuple[str, ...]] = []
+        self._values: List[Any] = []
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def _grams(self, key: str) -> set:
+        """切分n-gram（首尾补边界符，开头/结尾不同的名称相似度更低，如 温州/沧州新闻综合）"""
+        if not key:
+            return set()
+        n = self.n
+        padded = '\x02' + key + '\x03'
+        return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+    def add(self, name: str, value: Any) -> None:
+        """添加条目（同分时先添加的条目优先）"""
+        key = fuzzy_key(name)
+        grams = self._grams(key)
+        if not grams:
+            return
+        entry = len(self._values)
+        for gram in grams:
+            self._postings[gram].append(entry)
+        self._sizes.append(len(grams))
+        self._digits.append(tuple(_DIGITS.findall(key)))
+        self._values.append(value)
+
+    def lookup(self, name: str, threshold: float) -> Optional[Tuple[Any, float]]:
+        """返回相似度不低于阈值的最佳条目 (值, 相似度)，无候选时返回None"""
+        key = fuzzy_key(name)
+        grams = self._grams(key)
+        if not grams:
+            return None
+
+        overlaps: Dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for entry in self._postings.get(gram, ()):
+                overlaps[entry] += 1
+
+        digits = tuple(_DIGITS.findall(key))
+        size = len(grams)
+        best, best_score = -1, threshold
+        for entry, overlap in overlaps.items():
+            score = 2 * overlap / (size + self._sizes[entry])
+            if score < best_score or (score == best_score and best >= 0 and entry > best):
+                continue
+            if self._digits[entry] != digits:
+                continue
+            best, best_score = entry, score
+        return (self._values[best], best_score) if best >= 0 else None
@@ -0,0 +1,141 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+def summarize_curve(curve: Sequence[Tuple[float, int]], points: int = 12) -> str:
+    """并发变化曲线的文字摘要（最多points个采样点；也用于分片回传的曲线）"""
+    if len(curve) > points:
+        step = (len(curve) - 1) / (points - 1)
+        curve = [curve[round(i * step)] for i in range(points)]
+    return " → ".join(f"{limit}@{elapsed:.0f}s" for elapsed, limit in curve)
+
+class AimdLimiter:
+    """
+    AIMD自适应并发控制（加性增、乘性减）
+
+    每完成一个窗口（不少于当前并发数）的请求评估一次：
+    - 超时/连接失败率明显高于基线，或平均延迟超过基线的latency_factor倍 -> 并发乘以backoff
+    - 否则并发加increase
+    基线取各窗口观测到的最小失败率与最小平均延迟（类似最小RTT，避免基线随负载缓慢抬升而失效）；
+    调整之前发出的请求不计入下一窗口，每次调整只依据调整后的并发下的观测结果。
+    并发始终限制在 [minimum, maximum] 内，调整记录在curve中。
+    """
+
+    def __init__(self,
+                 initial: int,
+                 minimum: int,
+                 maximum: int,
+                 increase: float = 2,
+                 backoff: float = 0.7,
+                 error_tolerance: float = 0.15,
+                 latency_factor: float = 1.5,
+                 window: int = 20):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.increase = increase
+        self.backoff = backoff
+        self.error_tolerance = error_tolerance
+        self.latency_factor = latency_factor
+        self.window = window
+
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._start = time.monotonic()
+        self._changed_at = self._start
+        self.curve: List[Tuple[float, int]] = [(0.0, int(self.limit))]
+        self.decreases = 0
+
+        # 当前窗口与基线
+        self._samples = 0
+        self._failures = 0
+        self._latency_sum = 0.0
+        self._latency_count = 0
+        self._base_error: Optional[float] = None
+        self._base_latency: Optional[float] = None
+
+    @property
+    def current(self) -> int:
+        return int(self.limit)
+
+    async def acquire(self) -> None:
+        """等待并占用一个并发名额"""
+        while self._active >= self.current:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()
+                raise
+        self._active += 1
+
+    def release(self) -> None:
+        """释放并发名额"""
+        self._active -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        """按空闲名额数唤醒等待者（每个名额只唤醒一个，避免惊群）"""
+        free = self.current - self._active
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def record(self, started: float, failed: bool, latency: float = 0.0) -> None:
+        """
+        记录一次请求结果
+        started: 请求开始时间（time.monotonic()）；failed: 超时/连接失败；latency: 收到响应的延迟毫秒数
+        """
+        if started < self._changed_at:
+            return
+        self._samples += 1
+        if failed:
+            self._failures += 1
+        elif latency > 0:
+            self._latency_sum += latency
+            self._latency_count += 1
+        if self._samples >= max(self.window, self.current):
+            self._adjust()
+
+    def _adjust(self) -> None:
+        error_rate = self._failures / self._samples
+        latency = self._latency_sum / self._latency_count if self._latency_count else None
+        self._samples = self._failures = self._latency_count = 0
+        self._latency_sum = 0.0
+
+        congested = (
+            self._base_error is not None and error_rate > self._base_error + self.error_tolerance
+        ) or (
+            latency is not None and self._base_latency is not None
+            and latency > self._base_latency * self.latency_factor
+        )
+        previous = self.current
+        if congested:
+            self.limit = max(self.minimum, self.limit * self.backoff)
+            self.decreases += 1
+        else:
+            self.limit = min(self.maximum, self.limit + self.increase)
+        self._base_error = error_rate if self._base_error is None else min(self._base_error, error_rate)
+        if latency is not None:
+            self._base_latency = latency if self._base_latency is None else min(self._base_latency, latency)
+
+        if self.current != previous:
+            self._changed_at = time.monotonic()
+            self.curve.append((self._changed_at - self._start, self.current))
+            logger.debug(
+                f"并发调整: {previous} -> {self.current} | 失败率: {error_rate:.1%} | "
+                f"平均延迟: {latency or 0:.0f}ms"
+            )
+            self._wake()
+
+    def curve_summary(self, points: int = 12) -> str:
+        """并发变化曲线的文字摘要（最多points个采样点）"""
+        return summarize_curve(self.curve, points)
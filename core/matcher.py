@@ -1,12 +1,16 @@
 import re
 import time
 import logging
-from typing import Dict, List, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 from functools import lru_cache
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from operator import itemgetter
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 from .models import Channel
+from .template import REGEX_METACHARS, CompiledTemplate, clean_channel_name
+from .fuzzy import NgramIndex
+from .cache import read_cache, write_cache
 import configparser
-from collections import defaultdict
 from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
@@ -20,180 +24,215 @@ class MatchCache:
 class AutoCategoryMatcher:
     """智能分类匹配器（高性能优化版）"""
 
-    def __init__(self, template_path: str, config=None):
+    def __init__(self, template_path: str, config=None, template: Optional[CompiledTemplate] = None):
         """
         初始化分类匹配器
         
         参数:
             template_path: 分类模板文件路径
             config: 配置对象
+            template: 已编译的模板（为空时按模板路径加载）
         """
         self.template_path = template_path
         self.config = config or configparser.ConfigParser()
         self.enable_space_clean = self.config.getboolean('MATCHER', 'enable_space_clean', fallback=True)
+
+        # 模糊匹配兜底（0表示关闭）：模板规则均未命中时按n-gram相似度归入最接近的标准名称所属分类
+        self.fuzzy_threshold = 0.0
+        if self.config.getboolean('MATCHER', 'enable_fuzzy_match', fallback=False):
+            self.fuzzy_threshold = self.config.getfloat('MATCHER', 'fuzzy_threshold', fallback=0.8)
+        self._fuzzy_index: Optional[NgramIndex] = None
+
+        # 进程池并行分类（0表示在主进程中串行匹配）
+        self.classification_workers = self.config.getint('PERFORMANCE', 'classification_workers', fallback=0)
+        self.classification_batch_size = max(1, self.config.getint('PERFORMANCE', 'classification_batch_size', fallback=2000))
         
         # 初始化缓存和统计
         self.match_cache: Dict[str, MatchCache] = {}
         self.name_normalization_cache: Dict[str, str] = {}
-        self.template_order_cache: Dict[tuple, Dict[str, int]] = {}  # {channel_names_tuple: {name: index}}
         
-        # 加载模板数据
-        self.categories, self.standard_names = self._parse_template()
-        self.suffixes = self._extract_suffixes()
-        self.template_order = self._load_template_order()
+        # 加载编译后的模板（按模板内容哈希缓存，导出器与排序共用）
+        cache_dir = self.config.get('PATHS', 'cache_dir', fallback=None)
+        self.template = template or CompiledTemplate.load(template_path, cache_dir, self.enable_space_clean)
+        self.standard_names = self.template.standard_names
+        self.suffixes = self.template.suffixes
+        self.template_order = self.template.template_order
+        self._categories: Optional[Dict[str, List[re.Pattern]]] = None
+        self._regex_patterns: Optional[List[Tuple[int, re.Pattern]]] = None
+        self._regex_prefilter: Optional[re.Pattern] = None
+
+        # 跨运行分类结果缓存：名称 -> (分类, 匹配时的标准化名称, 标准化名称)，模板变化时自动失效
+        self.cache_file = None
+        if cache_dir and self.config.getboolean('PERFORMANCE', 'enable_match_cache', fallback=True):
+            self.cache_file = Path(cache_dir) / 'match_results.pkl'
+        self._cache_key = (
+            CompiledTemplate.FORMAT_VERSION, self.template.digest, self.enable_space_clean, self.fuzzy_threshold
+        )
+        self._cached_results: Dict[str, Tuple[str, str, str]] = {}
+        if self.cache_file:
+            self._cached_results = read_cache(self.cache_file, self._cache_key) or {}
+        self.cache_hits = 0
         
-        logger.info(f"分类器初始化完成 | 模板规则: {sum(len(p) for p in self.categories.values())}条")
+        logger.info(
+            f"分类器初始化完成 | 模板规则: {self.template.rule_count}条 "
+            f"(字面量: {len(self.template.literal_index)} | 正则: {len(self.template.regex_rules)})"
+        )
 
     def _clean_channel_name(self, name: str) -> str:
-        """清理频道名称（优化：使用缓存+批量处理）"""
+        """清理频道名称（未启用空格清理时原样返回）"""
         if not name or not self.enable_space_clean:
             return name
-            
-        # 1. 去除首尾空格和特殊字符
-        cleaned = name.strip().replace('_', ' ').replace('-', ' ')
-        # 2. 移除字母/数字与汉字之间的空格
-        cleaned = re.sub(r'([a-zA-Z0-9]+)\s+([\u4e00-\u9fa5])', r'\1\2', cleaned)
-        # 3. 合并多余空格
-        return re.sub(r'\s+', ' ', cleaned)
-
-    def _extract_suffixes(self) -> List[str]:
-        """从模板中提取后缀配置（优化：使用正则预编译）"""
-        suffix_pattern = re.compile(r'#suffixes:(.*)')
-        try:
-            with open(self.template_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    if match := suffix_pattern.search(line):
-                        return [s.strip().lower() for s in match.group(1).split(',') if s.strip()]
-        except Exception as e:
-            logger.error(f"后缀提取失败: {str(e)}")
-        return ["高清", "hd", "综合"]  # 默认后缀
-
-    def _parse_template(self) -> Tuple[Dict[str, List[re.Pattern]], Dict[str, str]]:
-        """
-        解析模板文件（优化：并行处理+预编译正则）
-        返回: (categories, standard_names)
-        """
-        categories = defaultdict(list)
-        standard_names = {}
-        current_category = None
-        
-        try:
-            with open(self.template_path, 'r', encoding='utf-8') as f:
-                lines = [line.strip() for line in f if line.strip() and not line.startswith('#')]
-                
-                # 并行处理正则编译
-                with ThreadPoolExecutor() as executor:
-                    futures = []
-                    for line in lines:
-                        if line.endswith(',#genre#'):
-                            current_category = line.split(',')[0]
-                            continue
-                            
-                        if current_category:
-                            parts = line.split('|')
-                            standard_name = parts[0].strip()
-                            futures.append(
-                                executor.submit(
-                                    self._compile_patterns,
-                                    parts,
-                                    current_category,
-                                    standard_name
-                                )
-                            )
-                    
-                    for future in as_completed(futures):
-                        category, patterns, name_mappings = future.result()
-                        categories[category].extend(patterns)
-                        standard_names.update(name_mappings)
-                        
-        except Exception as e:
-            logger.error(f"模板解析失败: {str(e)}")
-            raise
-            
-        return dict(categories), standard_names
+        return clean_channel_name(name)
 
-    def _compile_patterns(self, parts: List[str], category: str, standard_name: str) -> Tuple[str, List[re.Pattern], Dict[str, str]]:
-        """编译正则模式并构建名称映射（子任务函数）"""
-        patterns = []
-        name_mappings = {}
-        
-        for name in parts:
-            name = name.strip()
-            if not name:
-                continue
-                
+    @property
+    def categories(self) -> Dict[str, List[re.Pattern]]:
+        """各分类的已编译正则（按需编译，仅用于兼容/调试，匹配走索引）"""
+        if self._categories is None:
+            self._categories = {
+                category: [re.compile(rule) for rule in rules]
+                for category, rules in self.template.rules.items() if rules
+            }
+        return self._categories
+
+    def _compile_regexes(self) -> List[Tuple[int, re.Pattern]]:
+        """首次匹配时编译正则规则及合并预筛选（模板缓存只保存规则原文）"""
+        patterns = [(rank, re.compile(rule)) for rank, rule in self.template.regex_rules]
+        if patterns:
+            # 所有正则合并为一条预筛选（多数名称一次search即可排除全部正则）
             try:
-                # 编译正则并缓存
-                pattern = re.compile(name)
-                patterns.append(pattern)
-                
-                # 构建标准化名称映射
-                clean_name = self._clean_channel_name(name)
-                name_mappings[clean_name.lower()] = standard_name
-            except re.error as e:
-                logger.warning(f"正则编译跳过: {name} ({str(e)})")
-                
-        return category, patterns, name_mappings
+                self._regex_prefilter = re.compile('|'.join(f'(?:{rule})' for _, rule in self.template.regex_rules))
+            except re.error:
+                logger.debug("正则预筛选合并失败，逐条匹配")
+        self._regex_patterns = patterns
+        return patterns
+
+    def _lookup_category(self, normalized_name: str) -> str:
+        """
+        按索引查找分类（未匹配返回"未分类"）
+
+        可化简为子串的规则由自动机一次扫描得到最小分类序号，
+        再只检查序号更小的正则，结果与逐个分类、逐条正则search一致。
+        """
+        patterns = self._regex_patterns if self._regex_patterns is not None else self._compile_regexes()
+        category_order = self.template.category_order
+        best = self.template.literal_index.find(normalized_name)
+        if self._regex_prefilter and not self._regex_prefilter.search(normalized_name):
+            return category_order[best - 1] if best else "未分类"
+        for rank, pattern in patterns:
+            if best and rank >= best:
+                break
+            if pattern.search(normalized_name):
+                best = rank
+                break
+        return category_order[best - 1] if best else "未分类"
 
     def batch_match(self, channel_names: List[str]) -> Dict[str, str]:
         """
-        批量匹配分类（优化：并行处理+缓存）
+        批量匹配分类（先对名称去重，大批量时使用进程池并行匹配）
         返回: {channel_name: category}
         """
         if not channel_names:
             return {}
-            
-        # 小批量直接处理
-        if len(channel_names) <= 1000:
-            return {name: self.match(name) for name in channel_names}
-        
-        # 并行处理
-        threads = self.config.getint('PERFORMANCE', 'classification_threads', fallback=4)
-        batch_size = self.config.getint('PERFORMANCE', 'classification_batch_size', fallback=1000)
-        
-        logger.debug(f"启动并行分类 | 总数: {len(channel_names)} | 线程: {threads}")
-        
-        results = {}
-        with ThreadPoolExecutor(max_workers=threads) as executor:
-            futures = {
-                executor.submit(
-                    self._process_batch, 
-                    channel_names[i:i+batch_size]
-                ): i for i in range(0, len(channel_names), batch_size)
-            }
-            
-            for future in as_completed(futures):
-                results.update(future.result())
-                
-        return results
 
-    def _process_batch(self, names: List[str]) -> Dict[str, str]:
-        """处理单个批次的分类匹配"""
-        return {name: self.match(name) for name in names}
+        pending = [
+            name for name in dict.fromkeys(channel_names)
+            if name not in self.match_cache and not self._restore_cached(name)
+        ]
+        if self.classification_workers > 0 and len(pending) > self.classification_batch_size:
+            try:
+                self._match_in_pool(pending)
+            except Exception as e:
+                logger.warning(f"进程池分类失败，改为串行分类: {str(e)}")
+
+        return {name: self.match(name) for name in channel_names}
+
+    def _match_in_pool(self, names: List[str]) -> None:
+        """
+        在进程池中匹配名称，结果合并回本地缓存
+
+        每个工作进程只加载一次编译后的模板，名称按批次分发；
+        返回 (分类, 匹配时的标准化名称, 标准化名称)，合并后主进程无需再次匹配或标准化。
+        """
+        batch_size = self.classification_batch_size
+        batches = [names[i:i + batch_size] for i in range(0, len(names), batch_size)]
+        logger.debug(f"启动并行分类 | 名称: {len(names)} | 进程: {self.classification_workers} | 批次: {len(batches)}")
+
+        with ProcessPoolExecutor(
+            max_workers=self.classification_workers,
+            initializer=_init_match_worker,
+            initargs=(self.template_path, self.template, {
+                'enable_space_clean': str(self.enable_space_clean),
+                'enable_fuzzy_match': str(self.fuzzy_threshold > 0),
+                'fuzzy_threshold': str(self.fuzzy_threshold),
+            })
+        ) as executor:
+            for batch, results in zip(batches, executor.map(_match_batch_worker, batches)):
+                for name, (category, match_name, normalized_name) in zip(batch, results):
+                    self.match_cache[name] = MatchCache(category, match_name)
+                    self.name_normalization_cache[name] = normalized_name
 
     def match(self, channel_name: str) -> str:
         """
         匹配单个频道分类（优化：三级缓存）
         返回: 分类名称
         """
-        # 第一级缓存检查
+        # 第一级缓存检查（含上次运行保存的结果）
         if channel_name in self.match_cache:
             return self.match_cache[channel_name].category
+        if self._restore_cached(channel_name):
+            return self.match_cache[channel_name].category
             
         # 清理名称并检查第二级缓存
         clean_name = self._clean_channel_name(channel_name)
         normalized_name = self.normalize_channel_name(clean_name)
         
-        # 第三级缓存：模板匹配
-        for category, patterns in self.categories.items():
-            for pattern in patterns:
-                if pattern.search(normalized_name):
-                    self.match_cache[channel_name] = MatchCache(category, normalized_name)
-                    return category
-                    
-        # 未匹配情况
-        self.match_cache[channel_name] = MatchCache("未分类", normalized_name)
-        return "未分类"
+        # 模板匹配：字面量自动机 + 少量正则
+        category = self._lookup_category(normalized_name)
+        if category == "未分类" and self.fuzzy_threshold > 0:
+            category = self._fuzzy_category(normalized_name)
+        self.match_cache[channel_name] = MatchCache(category, normalized_name)
+        return category
+
+    def _fuzzy_category(self, normalized_name: str) -> str:
+        """模糊匹配兜底：返回最相似标准名称所属的分类（低于阈值返回"未分类"）"""
+        if self._fuzzy_index is None:
+            self._fuzzy_index = self._build_fuzzy_index()
+        result = self._fuzzy_index.lookup(normalized_name, self.fuzzy_threshold)
+        if result is None:
+            return "未分类"
+        (category, standard_name), score = result
+        logger.debug(f"模糊匹配: {normalized_name} -> {standard_name} ({category}, 相似度: {score:.2f})")
+        return category
+
+    def _build_fuzzy_index(self) -> NgramIndex:
+        """按模板顺序索引各分类的标准名称（跳过正则形式的条目）"""
+        index = NgramIndex()
+        for category, names in self.template_order.items():
+            for name in names:
+                if not any(c in REGEX_METACHARS for c in name):
+                    index.add(name, (category, name))
+        return index
+
+    def _restore_cached(self, name: str) -> bool:
+        """从跨运行缓存恢复单个名称的匹配结果（未命中返回False）"""
+        cached = self._cached_results.get(name)
+        if cached is None:
+            return False
+        category, match_name, normalized_name = cached
+        self.match_cache[name] = MatchCache(category, match_name)
+        self.name_normalization_cache.setdefault(name, normalized_name)
+        self.cache_hits += 1
+        return True
+
+    def save_cache(self) -> None:
+        """保存本次运行匹配过的名称（未再出现的名称自动淘汰）"""
+        if not self.cache_file:
+            return
+        results = {
+            name: (cached.category, cached.normalized_name, self.normalize_channel_name(name))
+            for name, cached in self.match_cache.items()
+        }
+        write_cache(self.cache_file, self._cache_key, results)
 
     def normalize_channel_name(self, name: str) -> str:
         """标准化频道名称（优化：缓存+后缀处理）"""
@@ -218,81 +257,62 @@ class AutoCategoryMatcher:
                                 channels: List[Channel], 
                                 whitelist: Set[str]) -> List[Channel]:
         """
-        按模板顺序排序频道（优化：预构建索引）
+        按模板顺序排序频道（单遍分桶，线性复杂度）
+
+        排序键为 (是否白名单, 分类序号, 分类内序号)：
+        白名单频道保持原顺序排在最前，其余按模板分类分桶，桶内按模板中的名称顺序稳定排序，
+        模板外分类的频道保持原顺序排在最后。
         返回: 排序后的频道列表
         """
-        # 白名单频道优先
-        whitelist_channels = [
-            c for c in channels 
-            if c.name.lower() in whitelist
-        ]
-        
-        # 按模板顺序排序其他频道
-        sorted_channels = []
-        for category in self.template_order:
-            category_channels = [
-                c for c in channels 
-                if c not in whitelist_channels and c.category == category
-            ]
-            sorted_channels.extend(
-                sorted(
-                    category_channels,
-                    key=lambda c: self._get_channel_order(c, self.template_order[category])
-                )
-            )
-        
-        # 添加未分类频道
-        uncategorized = [
-            c for c in channels 
-            if c not in whitelist_channels 
-            and c.category not in self.template_order
-        ]
-        sorted_channels.extend(uncategorized)
-        
-        return whitelist_channels + sorted_channels
-
-    def _get_channel_order(self, 
-                         channel: Channel, 
-                         channel_names: List[str]) -> int:
-        """获取频道在模板中的顺序（优化：缓存索引）"""
-        cache_key = tuple(channel_names)
-        if cache_key not in self.template_order_cache:
-            self.template_order_cache[cache_key] = {
-                name: i for i, name in enumerate(channel_names)
-            }
-            
-        clean_name = self.normalize_channel_name(channel.name)
-        return self.template_order_cache[cache_key].get(clean_name, len(channel_names))
+        # 分类 -> (分类序号, 分类内名称序号, 模板外名称的序号)
+        category_info = {
+            category: (rank, self.template.order_index[category], len(names))
+            for rank, (category, names) in enumerate(self.template_order.items())
+        }
+        buckets: List[List[Tuple[int, Channel]]] = [[] for _ in category_info]
+        whitelist_channels: List[Channel] = []
+        uncategorized: List[Channel] = []
 
-    def _load_template_order(self) -> Dict[str, List[str]]:
-        """加载模板中的频道顺序（优化：按需加载）"""
-        template_order = {}
-        current_category = None
-        
-        try:
-            with open(self.template_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith('#'):
-                        continue
-                        
-                    if line.endswith(',#genre#'):
-                        current_category = line.split(',')[0]
-                        template_order[current_category] = []
-                        continue
-                        
-                    if current_category:
-                        parts = line.split('|')
-                        if parts:
-                            template_order[current_category].append(parts[0].strip())
-        except Exception as e:
-            logger.error(f"模板顺序加载失败: {str(e)}")
-            
-        return template_order
+        for channel in channels:
+            if channel.name.lower() in whitelist:
+                whitelist_channels.append(channel)
+                continue
+            info = category_info.get(channel.category)
+            if info is None:
+                uncategorized.append(channel)
+                continue
+            rank, order_index, missing = info
+            buckets[rank].append((order_index.get(self.normalize_channel_name(channel.name), missing), channel))
+
+        sorted_channels = whitelist_channels
+        for bucket in buckets:
+            bucket.sort(key=itemgetter(0))
+            sorted_channels.extend(channel for _, channel in bucket)
+        sorted_channels.extend(uncategorized)
+        return sorted_channels
 
     def clear_cache(self):
         """清空缓存（用于长时间运行的服务）"""
         self.match_cache.clear()
         self.name_normalization_cache.clear()
-        self.template_order_cache.clear()
-        logger.info("分类器缓存已清空")
\ No newline at end of file
+        logger.info("分类器缓存已清空")
+
+# ==================== 进程池工作函数 ====================
+_worker_matcher: Optional[AutoCategoryMatcher] = None
+
+def _init_match_worker(template_path: str, template: CompiledTemplate, matcher_options: Dict[str, str]) -> None:
+    """工作进程初始化：每个进程只加载一次编译后的模板"""
+    global _worker_matcher
+    config = configparser.ConfigParser()
+    config.read_dict({'MATCHER': matcher_options})
+    logging.getLogger(__name__).setLevel(logging.WARNING)
+    _worker_matcher = AutoCategoryMatcher(template_path, config, template=template)
+
+def _match_batch_worker(names: List[str]) -> List[Tuple[str, str, str]]:
+    """工作进程匹配入口：返回 (分类, 匹配时的标准化名称, 标准化名称)"""
+    matcher = _worker_matcher
+    results = []
+    for name in names:
+        category = matcher.match(name)
+        results.append((category, matcher.match_cache[name].normalized_name, matcher.normalize_channel_name(name)))
+    return results
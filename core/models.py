@@ -1,10 +1,11 @@
 import re
-from typing import ClassVar
+from typing import ClassVar, Optional
+from .urls import UrlInfo
 
 class Channel:
     """频道数据模型（内存优化版）"""
     __slots__ = ['name', 'url', 'category', 'original_category', 
-                'status', 'response_time', 'download_speed']
+                'status', 'response_time', 'download_speed', 'dedup_key', 'info']
 
     # 类变量（静态变量）定义
     IPV4_PATTERN: ClassVar[re.Pattern] = re.compile(
@@ -22,7 +23,9 @@ class Channel:
                  original_category: str = "未分类",
                  status: str = "pending",
                  response_time: float = 0.0,
-                 download_speed: float = 0.0):
+                 download_speed: float = 0.0,
+                 dedup_key: str = "",
+                 info: Optional[UrlInfo] = None):
         self.name = name
         self.url = url
         self.category = category
@@ -30,8 +33,12 @@ class Channel:
         self.status = status
         self.response_time = response_time
         self.download_speed = download_speed
+        # 规范化URL去重键（解析时计算，为空时按原始URL去重）
+        self.dedup_key = dedup_key or url
+        # URL预解析信息（主机/端口/协议/IP类型，解析器传入时不再重复解析）
+        self.info = info or UrlInfo.from_url(url)
 
     @classmethod
     def classify_ip_type(cls, url: str) -> str:
-        """分类IP类型: ipv4 或 ipv6"""
-        return "ipv6" if cls.IPV6_PATTERN.search(url) else "ipv4"
\ No newline at end of file
+        """分类IP类型: ipv4 或 ipv6（已有Channel时直接读取channel.info.ipv6）"""
+        return "ipv6" if UrlInfo.from_url(url).ipv6 else "ipv4"
\ No newline at end of file
@@ -1,116 +1,329 @@
-import re
-from typing import Generator, List
+import hashlib
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncGenerator, AsyncIterator, Callable, Dict, Generator, Iterable, List, Optional, Tuple
 import logging
-from urllib.parse import urlparse, urlunparse, parse_qs, urlencode
+from urllib.parse import urlparse, urlsplit, urlunsplit, parse_qs, urlencode
 from .models import Channel
-from functools import lru_cache
+from .cache import read_cache, write_cache
+from .urls import UrlInfo, canonical_url
 
 logger = logging.getLogger(__name__)
 
+# 频道记录：(名称, URL, 原始分组, 去重键, URL预解析信息)，进程间传递与缓存均使用该紧凑格式
+ChannelRecord = Tuple[str, str, str, str, UrlInfo]
+
+# 分块解析时表示"沿用上一块末尾分组"的占位分组
+INHERIT_CATEGORY = '\x00inherit'
+
+class ParseState:
+    """逐行解析的跨行状态（当前分组与待配对的EXTINF行）"""
+    __slots__ = ['category', 'extinf']
+
+    def __init__(self):
+        self.category: Optional[str] = None
+        self.extinf: Optional[str] = None
+
 class PlaylistParser:
     """M3U解析器（支持源分类保留）"""
     
-    CHANNEL_REGEX = re.compile(r'^(.*?),(http.*)$', re.MULTILINE)
-    EXTINF_REGEX = re.compile(
-        r'#EXTINF:-?[\d.]*,?(.*?)(?:\s+tvg-name="([^"]*)")?(?:\s+tvg-logo="([^"]*)")?(?:\s+group-title="([^"]*)")?.*\n(.*)',
-        re.IGNORECASE
-    )
-    GROUP_TITLE_REGEX = re.compile(r'group-title="([^"]+)"')
-    TVG_NAME_REGEX = re.compile(r'tvg-name="([^"]+)"')
-    TVG_LOGO_REGEX = re.compile(r'tvg-logo="([^"]+)"')
-    
+    # 解析结果格式版本（解析逻辑变化时递增，使旧的解析缓存失效）
+    CACHE_VERSION = 5
+
+    # 支持的流媒体协议
+    VALID_SCHEMES = frozenset({'http', 'https', 'udp', 'rtp', 'rtsp'})
+    # TXT格式 "名称,URL" 中URL的起始标识
+    URL_PREFIXES = ('http', 'udp://', 'rtp://', 'rtsp://')
+
     def __init__(self, config=None):
         self.config = config
-        self.params_to_remove = set()
+        params_to_remove, volatile_params = [], []
         if config and config.has_section('URL_FILTER'):
-            params = config.get('URL_FILTER', 'remove_params', fallback='')
-            self.params_to_remove = {p.strip() for p in params.split(',') if p.strip()}
+            params_to_remove = config.get('URL_FILTER', 'remove_params', fallback='').split(',')
+            # 去重键中忽略的易变参数（时间戳、签名等）
+            volatile_params = config.get('URL_FILTER', 'volatile_params', fallback='').split(',')
+        self.set_url_filters(params_to_remove, volatile_params)
+
+        # 解析结果缓存（按内容哈希，未变化的订阅源无需重复解析）
+        self.cache_file = None
+        if config and config.getboolean('PERFORMANCE', 'enable_parse_cache', fallback=True):
+            self.cache_file = Path(config.get('PATHS', 'cache_dir', fallback='cache')) / 'parsed_sources.pkl'
+        self._cache_key = (
+            self.CACHE_VERSION, tuple(sorted(self.params_to_remove)), tuple(sorted(self.volatile_params))
+        )
+        self._cached_results: Dict[str, List[ChannelRecord]] = {}
+        self._used_results: Dict[str, List[ChannelRecord]] = {}
+        if self.cache_file:
+            self._cached_results = read_cache(self.cache_file, self._cache_key) or {}
+        self.cache_hits = 0
+
+        # 进程池并行解析（0表示在主进程中串行解析）
+        self.parse_workers = config.getint('PERFORMANCE', 'parse_workers', fallback=0) if config else 0
+        self.parse_chunk_size = config.getint('PERFORMANCE', 'parse_chunk_size', fallback=2 * 1024 * 1024) if config else 2 * 1024 * 1024
+
+    def set_url_filters(self, params_to_remove: Iterable[str], volatile_params: Iterable[str] = ()) -> None:
+        """设置URL参数过滤规则（会清空URL清理缓存）"""
+        self.params_to_remove = {p.strip() for p in params_to_remove if p.strip()}
+        self.volatile_params = {p.strip().lower() for p in volatile_params if p.strip()}
+        self._key_drop_params = frozenset({p.lower() for p in self.params_to_remove} | self.volatile_params)
+        self._url_cache: Dict[str, Tuple[str, str, Optional[UrlInfo]]] = {}
+        # URL信息只与协议/主机/端口/UDP特征有关，同一端点的URL共享同一对象
+        self._url_infos: Dict[tuple, UrlInfo] = {}
+
+    def parse_all(self, contents: List[str], progress_cb: Optional[Callable] = None) -> List[Channel]:
+        """批量解析订阅源为频道对象列表"""
+        return [
+            Channel(name=name, url=url, original_category=category, dedup_key=key, info=info)
+            for records in self.parse_all_records(contents, progress_cb)
+            for name, url, category, key, info in records
+        ]
+
+    def parse_all_records(self, contents: List[str],
+                          progress_cb: Optional[Callable] = None) -> List[List[ChannelRecord]]:
+        """
+        批量解析订阅源为频道记录（带解析缓存，可选进程池并行）
+
+        未命中缓存的订阅源按 #EXTINF 边界切块后分发到进程池，
+        工作进程返回紧凑的频道记录，主进程按原顺序合并。
+        返回: 与contents一一对应的记录列表
+        """
+        progress_cb = progress_cb or (lambda *_: None)
+        results: List[Optional[List[ChannelRecord]]] = [None] * len(contents)
+        digests: List[Optional[str]] = [None] * len(contents)
+        pending = []
+
+        for i, content in enumerate(contents):
+            if self.cache_file:
+                digests[i] = hashlib.sha1(content.encode('utf-8', errors='surrogatepass')).hexdigest()
+                if (records := self._cached_results.get(digests[i])) is not None:
+                    self.cache_hits += 1
+                    results[i] = records
+                    progress_cb()
+                    continue
+            pending.append(i)
+
+        pending_size = sum(len(contents[i]) for i in pending)
+        if self.parse_workers > 0 and pending_size > self.parse_chunk_size:
+            try:
+                self._parse_in_pool(contents, pending, results, progress_cb)
+            except Exception as e:
+                logger.warning(f"进程池解析失败，改为串行解析: {str(e)}")
+
+        for i in pending:
+            if results[i] is None:
+                try:
+                    results[i] = self.parse_records(contents[i])
+                except Exception as e:
+                    logger.error(f"解析异常: {str(e)}")
+                    results[i] = []
+                progress_cb()
+
+        for digest, records in zip(digests, results):
+            if digest:
+                self._used_results[digest] = records
+        return results
+
+    def _parse_in_pool(self, contents: List[str], pending: List[int],
+                       results: List[Optional[List[ChannelRecord]]], progress_cb: Callable) -> None:
+        """在进程池中解析指定订阅源（大订阅源切块并行）"""
+        with ProcessPoolExecutor(
+            max_workers=self.parse_workers,
+            initializer=_init_parse_worker,
+            initargs=(tuple(self.params_to_remove), tuple(self.volatile_params))
+        ) as executor:
+            jobs = [
+                (i, [executor.submit(_parse_chunk_worker, chunk)
+                     for chunk in self.split_chunks(contents[i], self.parse_chunk_size)])
+                for i in pending
+            ]
+            for i, futures in jobs:
+                records: List[ChannelRecord] = []
+                carry = None
+                for future in futures:
+                    chunk_records, final_category = future.result()
+                    inherited = carry or "未分类"
+                    records.extend(
+                        (name, url, inherited if category == INHERIT_CATEGORY else category, key, info)
+                        for name, url, category, key, info in chunk_records
+                    )
+                    if final_category != INHERIT_CATEGORY:
+                        carry = final_category
+                results[i] = records
+                progress_cb()
+
+    @staticmethod
+    def split_chunks(content: str, chunk_size: int) -> List[str]:
+        """按行切分内容块（M3U只在 #EXTINF 行前切分，保证EXTINF与URL不被拆开）"""
+        if len(content) <= chunk_size:
+            return [content]
+        marker = '\n#EXTINF' if '#EXTINF' in content else '\n'
+        chunks = []
+        start = 0
+        while start < len(content):
+            cut = content.find(marker, start + chunk_size)
+            if cut == -1:
+                chunks.append(content[start:])
+                break
+            chunks.append(content[start:cut + 1])
+            start = cut + 1
+        return chunks
+
+    def parse_records(self, content: str, category: Optional[str] = None) -> List[ChannelRecord]:
+        """解析内容为频道记录列表"""
+        state = ParseState()
+        state.category = category
+        records = []
+        for line in content.splitlines():
+            if (record := self._parse_line(line, state)) is not None:
+                records.append(record)
+        return records
+
+    def parse_chunk(self, chunk: str) -> Tuple[List[ChannelRecord], Optional[str]]:
+        """
+        解析内容块（进程池工作单元）
+        返回: (频道记录, 块结束时的分组)，块开头尚未确定分组的记录标记为INHERIT_CATEGORY
+        """
+        state = ParseState()
+        state.category = INHERIT_CATEGORY
+        records = []
+        for line in chunk.splitlines():
+            if (record := self._parse_line(line, state)) is not None:
+                records.append(record)
+        return records, state.category
+
+    def save_cache(self) -> None:
+        """保存本次用到的解析结果（未再出现的内容自动淘汰）"""
+        if self.cache_file:
+            write_cache(self.cache_file, self._cache_key, self._used_results)
 
     def parse(self, content: str) -> Generator[Channel, None, None]:
         """解析内容生成频道列表（保留原始分类）"""
-        lines = content.splitlines()
-        batch_size = min(1000, len(lines) // 10 or 100)
-        
-        current_category = None
-        current_extinf = None
-        for i in range(0, len(lines), batch_size):
-            batch = lines[i:i+batch_size]
-            for channel in self._parse_batch(batch, current_category, current_extinf):
-                current_category = channel.original_category
-                yield channel
-
-    def _parse_batch(self, batch: List[str], current_category: str, current_extinf: str) -> Generator[Channel, None, None]:
-        """解析内容批次（带分类提取）"""
-        channel_matches = []
-        
-        for line in batch:
-            line = line.strip()
-            if not line:
-                continue
-                
+        state = ParseState()
+        for line in content.splitlines():
+            if (record := self._parse_line(line, state)) is not None:
+                yield Channel(name=record[0], url=record[1], original_category=record[2],
+                              dedup_key=record[3], info=record[4])
+
+    async def parse_stream(self, lines: AsyncIterator[str]) -> AsyncGenerator[Channel, None]:
+        """流式解析：逐行消费异步行迭代器，边读取边输出频道"""
+        state = ParseState()
+        async for line in lines:
+            if (record := self._parse_line(line, state)) is not None:
+                yield Channel(name=record[0], url=record[1], original_category=record[2],
+                              dedup_key=record[3], info=record[4])
+
+    def _parse_line(self, line: str, state: 'ParseState') -> Optional[ChannelRecord]:
+        """
+        单遍状态机解析单行内容，跨行状态保存在state中
+
+        支持:
+            #EXTINF:-1 tvg-id="" tvg-name="" tvg-logo="" group-title="" catchup="",标题
+            分类名,#genre#
+            频道名,URL
+        """
+        line = line.strip()
+        if not line:
+            return None
+
+        if line[0] == '#':
             if line.startswith('#EXTINF'):
-                current_extinf = line
-                # 从EXTINF行提取group-title
-                if match := self.GROUP_TITLE_REGEX.search(line):
-                    current_category = match.group(1)
-                elif match := self.EXTINF_REGEX.match(line):
-                    if match.group(4):  # group-title from EXTINF_REGEX
-                        current_category = match.group(4)
-            elif current_extinf and line.startswith('http'):
-                # 处理完整的EXTINF + URL组合
-                if match := self.EXTINF_REGEX.match(current_extinf):
-                    name = match.group(2) or match.group(1)  # 优先使用tvg-name
-                    logo = match.group(3)
-                    group_title = match.group(4) or current_category
-                    
-                    channel_matches.append((
-                        name.strip() if name else self._clean_name(current_extinf),
-                        line,
-                        group_title or "未分类",
-                        logo
-                    ))
-                else:
-                    channel_matches.append((
-                        self._clean_name(current_extinf),
-                        line,
-                        current_category or "未分类",
-                        None
-                    ))
-                current_extinf = None
+                attrs, title = self.parse_extinf(line)
+                state.extinf = title or attrs.get('tvg-name', '')
+                if group := attrs.get('group-title'):
+                    state.category = group
+            return None
+
+        if state.extinf is not None and line.startswith(self.URL_PREFIXES):
+            # EXTINF + URL组合
+            name, state.extinf = state.extinf, None
+            return self._build_channel(name, line, state.category)
+
+        comma = line.find(',')
+        if comma == -1:
+            return None
+        if line.endswith('#genre#'):
+            state.category = line[:comma].strip()
+            return None
+
+        # TXT格式：取第一个后面紧跟URL的逗号作为分隔
+        while comma != -1 and not line.startswith(self.URL_PREFIXES, comma + 1):
+            comma = line.find(',', comma + 1)
+        if comma == -1:
+            return None
+        return self._build_channel(line[:comma], line[comma + 1:], state.category)
+
+    @staticmethod
+    def parse_extinf(line: str) -> Tuple[Dict[str, str], str]:
+        """
+        单遍扫描EXTINF行
+        返回: ({属性名(小写): 属性值}, 标题)
+        """
+        attrs: Dict[str, str] = {}
+        n = len(line)
+        # 跳过 "#EXTINF:时长"
+        i = line.find(':')
+        if i == -1:
+            return attrs, ''
+        i += 1
+        while i < n and line[i] not in ' \t,':
+            i += 1
+
+        while i < n:
+            c = line[i]
+            if c == ',':
+                return attrs, line[i + 1:].strip()
+            if c == ' ' or c == '\t':
+                i += 1
+                continue
+
+            # 读取属性名（到 '=' 为止，遇到空白/逗号则为无值属性）
+            j = i
+            while j < n and line[j] not in '= \t,':
+                j += 1
+            if j >= n or line[j] != '=':
+                i = j
+                continue
+            key = line[i:j].lower()
+
+            # 读取属性值（支持双引号、单引号及无引号）
+            j += 1
+            if j < n and line[j] in '"\'':
+                end = line.find(line[j], j + 1)
+                if end == -1:
+                    end = n
+                attrs[key] = line[j + 1:end]
+                i = end + 1
             else:
-                if match := self.CHANNEL_REGEX.match(line):
-                    channel_matches.append((match.group(1), match.group(2), current_category, None))
-                elif match := self.EXTINF_REGEX.match(line):
-                    name = match.group(2) or match.group(1)
-                    channel_matches.append((
-                        name.strip() if name else self._clean_name(line),
-                        match.group(5),
-                        match.group(4) or current_category or "未分类",
-                        match.group(3)
-                    ))
-
-        for name, url, category, logo in channel_matches:
-            channel = Channel(
-                name=self._clean_name(name),
-                url=self._clean_url(url),  # 这里调用清理URL函数
-                original_category=category or "未分类"  # 确保始终有分类
-            )
-            if logo:
-                channel.logo = logo
-            yield channel
+                end = j
+                while end < n and line[end] not in ' \t,':
+                    end += 1
+                attrs[key] = line[j:end]
+                i = end
+
+        return attrs, ''
+
+    def _build_channel(self, name: str, url: str, category: Optional[str]) -> Optional[ChannelRecord]:
+        """构造频道记录（URL无效时跳过）"""
+        url, key, info = self._clean_url(url)
+        if not url:
+            return None
+        return self._clean_name(name), url, category or "未分类", key, info  # 确保始终有分类
 
     def _clean_name(self, raw_name: str) -> str:
-        """清理频道名称（保留原始名称）"""
-        # 处理EXTINF行中的名称
-        if raw_name.startswith('#EXTINF'):
-            if match := re.search(r'#EXTINF:-?\d+,(.*)', raw_name):
-                return match.group(1).strip()
-            return raw_name.split(',')[-1].strip()
-        
-        # 处理普通名称
-        return raw_name.split(',')[-1].strip()
+        """清理频道名称（保留原始名称，取最后一个逗号后的部分）"""
+        return raw_name.rsplit(',', 1)[-1].strip()
+
+    def _clean_url(self, raw_url: str) -> Tuple[str, str, Optional[UrlInfo]]:
+        """
+        清理URL（带参数过滤）并计算去重键与URL预解析信息，结果按原始URL缓存
+        返回: (清理后的URL, 规范化去重键, URL信息)，无效URL返回 ("", "", None)
+        """
+        if (cached := self._url_cache.get(raw_url)) is not None:
+            return cached
+        result = self._url_cache[raw_url] = self._clean_url_uncached(raw_url)
+        return result
 
-    def _clean_url(self, raw_url: str) -> str:
+    def _clean_url_uncached(self, raw_url: str) -> Tuple[str, str, Optional[UrlInfo]]:
         """清理URL（带参数过滤）- 修复URL拼接问题"""
         # 第一步：处理多个URL用#分隔的情况（取第一个有效URL）
         if '#' in raw_url:
@@ -129,24 +342,33 @@ class PlaylistParser:
         # 第二步：处理$符号（通常用于参数分隔）
         url = raw_url.split('$')[0].strip()
         
-        # 第三步：过滤不需要的URL参数
-        if self.params_to_remove:
+        # 第三步：解析URL（仅解析一次，同时用于参数过滤与格式验证）
+        try:
+            parsed = urlsplit(url)
+        except ValueError:
+            logger.warning(f"无效URL格式: {url}")
+            return "", "", None
+
+        # 第四步：验证URL格式
+        if not parsed.netloc or parsed.scheme not in self.VALID_SCHEMES:
+            logger.warning(f"无效URL格式: {url}")
+            return "", "", None  # 返回空字符串而不是无效URL
+
+        # 第五步：过滤不需要的URL参数（查询串中不含任何待移除参数名时跳过重新编码）
+        if self.params_to_remove and parsed.query and any(p in parsed.query for p in self.params_to_remove):
             try:
-                parsed = urlparse(url)
-                if parsed.query:
-                    query_params = parse_qs(parsed.query, keep_blank_values=True)
-                    filtered_params = {k: v for k, v in query_params.items() if k not in self.params_to_remove}
-                    new_query = urlencode(filtered_params, doseq=True)
-                    url = urlunparse(parsed._replace(query=new_query))
+                query_params = parse_qs(parsed.query, keep_blank_values=True)
+                filtered_params = {k: v for k, v in query_params.items() if k not in self.params_to_remove}
+                new_query = urlencode(filtered_params, doseq=True)
+                url = urlunsplit(parsed._replace(query=new_query))
             except Exception as e:
                 logger.warning(f"URL参数处理失败: {url}, 错误: {str(e)}")
-        
-        # 第四步：验证URL格式
-        if not self._is_valid_url(url):
-            logger.warning(f"无效URL格式: {url}")
-            return ""  # 返回空字符串而不是无效URL
-        
-        return url
+
+        # 第六步：计算规范化去重键（与URL相同时复用同一字符串对象）及URL预解析信息
+        key = canonical_url(parsed, self._key_drop_params)
+        info = UrlInfo.from_split(parsed, url)
+        info = self._url_infos.setdefault((info.scheme, info.host, info.port, info.udp), info)
+        return url, (url if key == url else key), info
 
     def _is_valid_url(self, url: str) -> bool:
         """验证URL格式是否有效"""
@@ -157,8 +379,7 @@ class PlaylistParser:
                 return False
             
             # 支持的协议
-            valid_schemes = {'http', 'https', 'udp', 'rtp', 'rtsp'}
-            if parsed.scheme not in valid_schemes:
+            if parsed.scheme not in self.VALID_SCHEMES:
                 return False
                 
             return True
@@ -177,4 +398,17 @@ class PlaylistParser:
                 if self._is_valid_url(url_part):
                     return url_part
         
-        return primary_url
\ No newline at end of file
+        return primary_url
+
+# ==================== 进程池工作函数 ====================
+_worker_parser: Optional[PlaylistParser] = None
+
+def _init_parse_worker(params_to_remove: Tuple[str, ...], volatile_params: Tuple[str, ...]) -> None:
+    """工作进程初始化：每个进程只创建一次解析器"""
+    global _worker_parser
+    _worker_parser = PlaylistParser()
+    _worker_parser.set_url_filters(params_to_remove, volatile_params)
+
+def _parse_chunk_worker(chunk: str) -> Tuple[List[ChannelRecord], Optional[str]]:
+    """工作进程解析入口"""
+    return _worker_parser.parse_chunk(chunk)
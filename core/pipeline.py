@@ -0,0 +1,155 @@
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Set, Tuple
+from .models import Channel
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class StageStats:
+    """流水线阶段统计"""
+    name: str
+    items_in: int = 0
+    items_out: int = 0
+    busy: float = 0.0          # 阶段内实际处理耗时（秒）
+    first_output: float = 0.0  # 首个输出距流水线启动的时间（秒）
+    finished: float = 0.0      # 阶段结束距流水线启动的时间（秒）
+
+class ChannelPipeline:
+    """
+    流水线执行器
+
+    获取解析 → 去重 → 黑名单 → 分类 → 测速 各阶段并发运行，
+    阶段之间通过有界队列传递频道，下游处理不过来时上游自动等待（背压）。
+    """
+
+    # CPU阶段每处理多少个频道主动让出一次事件循环
+    YIELD_EVERY = 64
+
+    def __init__(self, fetcher, parser, blacklist, matcher, tester,
+                 whitelist: Set[str], queue_size: int = 2000):
+        self.fetcher = fetcher
+        self.parser = parser
+        self.blacklist = blacklist
+        self.matcher = matcher
+        self.tester = tester
+        self.whitelist = whitelist
+        self.queue_size = max(1, queue_size)
+        self.stats: List[StageStats] = []
+        self._start = 0.0
+
+    def _elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    async def run(self,
+                  urls: List[str],
+                  source_cb: Optional[Callable] = None,
+                  test_cb: Optional[Callable] = None) -> Tuple[List[Channel], Set[str]]:
+        """
+        运行流水线
+        返回: (已分类频道列表, 测速失败URL集合)
+        """
+        self._start = time.perf_counter()
+        source_cb = source_cb or (lambda *_: None)
+        results: List[Channel] = []
+        failed_urls: Set[str] = set()
+        seen_keys: Set[str] = set()
+
+        parsed, deduped, filtered, classified = (asyncio.Queue(maxsize=self.queue_size) for _ in range(4))
+
+        def dedup(channel: Channel) -> Optional[Channel]:
+            if channel.dedup_key in seen_keys:
+                return None
+            seen_keys.add(channel.dedup_key)
+            return channel
+
+        def filter_blacklist(channel: Channel) -> Optional[Channel]:
+            return None if self.blacklist and self.blacklist.is_blacklisted(channel) else channel
+
+        def classify(channel: Channel) -> Channel:
+            channel.category = self.matcher.match(channel.name)
+            channel.name = self.matcher.normalize_channel_name(channel.name)
+            results.append(channel)
+            return channel
+
+        test_stats = StageStats("测速")
+        self.stats = [StageStats("获取解析"), StageStats("去重"), StageStats("黑名单"), StageStats("分类"), test_stats]
+
+        async def run_tester() -> None:
+            def on_tested(n: int = 1) -> None:
+                if not test_stats.items_in:
+                    test_stats.first_output = self._elapsed()
+                test_stats.items_in += n
+                if test_cb:
+                    test_cb(n)
+            await self.tester.test_queue(classified, on_tested, failed_urls, self.whitelist)
+            test_stats.items_out = sum(1 for c in results if c.status == 'online')
+            test_stats.finished = self._elapsed()
+
+        # 任一阶段异常时取消其余阶段（否则上游阻塞在已满的队列上，下游永远等不到结束标记）
+        tasks = [asyncio.ensure_future(stage) for stage in (
+            self._source_stage(self.stats[0], urls, parsed, source_cb),
+            self._run_stage(self.stats[1], parsed, deduped, dedup),
+            self._run_stage(self.stats[2], deduped, filtered, filter_blacklist),
+            self._run_stage(self.stats[3], filtered, classified, classify),
+            run_tester()
+        )]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        test_stats.busy = test_stats.finished
+        return results, failed_urls
+
+    async def _source_stage(self, stats: StageStats, urls: List[str],
+                            outbox: asyncio.Queue, source_cb: Callable) -> None:
+        """源阶段：流式获取并解析订阅源"""
+        try:
+            async for channel in self.fetcher.stream_channels(urls, self.parser, source_cb):
+                stats.items_out += 1
+                if stats.items_out == 1:
+                    stats.first_output = self._elapsed()
+                await outbox.put(channel)
+        finally:
+            stats.items_in = len(urls)
+            stats.finished = stats.busy = self._elapsed()
+        await outbox.put(None)
+
+    async def _run_stage(self, stats: StageStats, inbox: asyncio.Queue, outbox: asyncio.Queue,
+                         func: Callable[[Channel], Optional[Channel]]) -> None:
+        """通用CPU阶段：逐个处理频道并转发到下一队列（None表示结束）"""
+        try:
+            while (channel := await inbox.get()) is not None:
+                stats.items_in += 1
+                start = time.perf_counter()
+                try:
+                    channel = func(channel)
+                except Exception as e:
+                    logger.error(f"{stats.name}阶段处理异常: {str(e)}")
+                    channel = None
+                stats.busy += time.perf_counter() - start
+                if channel is not None:
+                    stats.items_out += 1
+                    if stats.items_out == 1:
+                        stats.first_output = self._elapsed()
+                    await outbox.put(channel)
+                if stats.items_in % self.YIELD_EVERY == 0:
+                    await asyncio.sleep(0)
+        finally:
+            stats.finished = self._elapsed()
+        await outbox.put(None)
+
+    def report(self) -> List[str]:
+        """生成各阶段耗时报告"""
+        lines = []
+        for s in self.stats:
+            lines.append(
+                f"• {s.name}: 输入 {s.items_in} | 输出 {s.items_out} | "
+                f"处理耗时 {s.busy:.2f}s | 首个输出 {s.first_output:.2f}s | 结束于 {s.finished:.2f}s"
+            )
+        return lines
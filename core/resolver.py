@@ -0,0 +1,137 @@
+import time
+import socket
+import asyncio
+import logging
+import ipaddress
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import DefaultResolver
+from .cache import read_cache, write_cache
+
+try:
+    from aiohttp.abc import ResolveResult
+except ImportError:  # aiohttp < 3.10 未导出ResolveResult，解析结果为普通字典
+    ResolveResult = Dict[str, Any]
+
+logger = logging.getLogger(__name__)
+
+# 缓存条目：(过期时间戳, 解析结果；None表示解析失败)
+CacheEntry = Tuple[float, Optional[List[ResolveResult]]]
+
+# 确定性的解析失败（域名不存在/无记录）才写入负缓存；EAI_AGAIN等临时错误直接抛出，重试时重新查询
+DEFINITIVE_ERRORS = frozenset(
+    code for code in (getattr(socket, 'EAI_NONAME', None), getattr(socket, 'EAI_NODATA', None))
+    if code is not None
+)
+
+def is_ip_literal(host: str) -> bool:
+    """是否为IP地址（IPv6可带方括号），IP地址无需解析"""
+    try:
+        ipaddress.ip_address(host.strip('[]'))
+        return True
+    except ValueError:
+        return False
+
+
+class CachingResolver(AbstractResolver):
+    """
+    带缓存的DNS解析器（订阅源获取与测速共用同一实例）
+
+    - 成功结果缓存ttl秒，域名不存在（负缓存）缓存negative_ttl秒，临时错误不缓存
+    - 同一主机的并发查询合并为一次
+    - 成功结果可持久化到磁盘，跨运行复用（加载时丢弃已过期条目；负缓存不落盘）
+    """
+
+    # 磁盘缓存格式（结构变化时递增）
+    CACHE_KEY = ('dns', 1)
+
+    def __init__(self, ttl: float = 3600, negative_ttl: float = 300, cache_file: Optional[Union[str, Path]] = None):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.cache_file = Path(cache_file) if cache_file else None
+        self._resolver: Optional[AbstractResolver] = None
+        self._cache: Dict[Tuple[str, int], CacheEntry] = {}
+        self._inflight: Dict[Tuple[str, int], asyncio.Task] = {}
+        self.hits = 0
+        self.lookups = 0
+        self.failures = 0
+
+        if self.cache_file:
+            now = time.time()
+            cached = read_cache(self.cache_file, self.CACHE_KEY) or {}
+            self._cache = {key: entry for key, entry in cached.items() if entry[0] > now}
+
+    def __getstate__(self) -> dict:
+        """传给测速子进程时只携带缓存内容（子进程不写回磁盘缓存）"""
+        state = self.__dict__.copy()
+        state.update(_resolver=None, _inflight={}, cache_file=None)
+        return state
+
+    async def resolve(self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_INET) -> List[ResolveResult]:
+        key = (host, int(family))
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] > time.time():
+            self.hits += 1
+            records = entry[1]
+        else:
+            task = self._inflight.get(key)
+            if task is None:
+                task = self._inflight[key] = asyncio.ensure_future(self._lookup(host, family))
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            records = await asyncio.shield(task)
+
+        if records is None:
+            raise socket.gaierror(socket.EAI_NONAME, f"DNS解析失败（缓存）: {host}")
+        return [{**record, 'hostname': host, 'port': port} for record in records]
+
+    async def _lookup(self, host: str, family: socket.AddressFamily) -> Optional[List[ResolveResult]]:
+        """实际查询并写入缓存（仅确定性失败写入负缓存，临时错误原样抛出）"""
+        if self._resolver is None:
+            self._resolver = DefaultResolver()
+        self.lookups += 1
+        try:
+            records = await self._resolver.resolve(host, 0, family)
+            self._cache[(host, int(family))] = (time.time() + self.ttl, records)
+            return records
+        except OSError as e:
+            self.failures += 1
+            logger.debug(f"DNS解析失败: {host} ({str(e)})")
+            if not isinstance(e, socket.gaierror) or e.errno not in DEFINITIVE_ERRORS:
+                raise
+            self._cache[(host, int(family))] = (time.time() + self.negative_ttl, None)
+            return None
+
+    async def resolve_all(self,
+                          hosts: Iterable[str],
+                          concurrency: int = 50,
+                          family: socket.AddressFamily = socket.AF_UNSPEC) -> Set[str]:
+        """并发预解析多个主机名（跳过IP地址），返回确定无法解析的主机（临时错误的主机不计入）"""
+        pending = iter({host for host in hosts if host and not is_ip_literal(host)})
+        unresolved: Set[str] = set()
+
+        async def worker() -> None:
+            for host in pending:
+                try:
+                    await self.resolve(host, 0, family)
+                except socket.gaierror as e:
+                    if e.errno in DEFINITIVE_ERRORS:
+                        unresolved.add(host)
+                except OSError:
+                    pass
+
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+        return unresolved
+
+    def save(self) -> None:
+        """保存未过期的成功解析结果（负缓存只在本次运行内有效）"""
+        if self.cache_file:
+            now = time.time()
+            write_cache(self.cache_file, self.CACHE_KEY, {
+                key: entry for key, entry in self._cache.items() if entry[0] > now and entry[1] is not None
+            })
+
+    async def close(self) -> None:
+        if self._resolver is not None:
+            await self._resolver.close()
+            self._resolver = None
@@ -0,0 +1,229 @@
+import logging
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence
+from .models import Channel
+from .urls import UrlInfo
+
+logger = logging.getLogger(__name__)
+
+# 状态编码（列中只保存1字节编号）
+STATUSES = ('pending', 'online', 'offline')
+_STATUS_IDS = {status: i for i, status in enumerate(STATUSES)}
+
+class ChannelRow:
+    """
+    ChannelTable中单行的轻量视图
+
+    属性与Channel一致，读写直接作用于表的列，
+    因此测速器、排序和导出器无需修改即可处理列式数据。
+    """
+    __slots__ = ['table', 'index']
+
+    def __init__(self, table: 'ChannelTable', index: int):
+        self.table = table
+        self.index = index
+
+    @property
+    def name(self) -> str:
+        return self.table.names[self.index]
+
+    @name.setter
+    def name(self, value: str) -> None:
+        self.table.names[self.index] = value
+
+    @property
+    def url(self) -> str:
+        return self.table.urls[self.index]
+
+    @property
+    def dedup_key(self) -> str:
+        return self.table.keys[self.index]
+
+    @property
+    def info(self) -> UrlInfo:
+        return self.table.infos[self.index]
+
+    @property
+    def host(self) -> str:
+        return self.table.hosts[self.table.host_ids[self.index]]
+
+    @property
+    def category(self) -> str:
+        return self.table.categories[self.table.category_ids[self.index]]
+
+    @category.setter
+    def category(self, value: str) -> None:
+        self.table.category_ids[self.index] = self.table.intern_category(value)
+
+    @property
+    def original_category(self) -> str:
+        return self.table.categories[self.table.original_category_ids[self.index]]
+
+    @property
+    def status(self) -> str:
+        return STATUSES[self.table.status_ids[self.index]]
+
+    @status.setter
+    def status(self, value: str) -> None:
+        self.table.status_ids[self.index] = _STATUS_IDS[value]
+
+    @property
+    def response_time(self) -> float:
+        return self.table.response_times[self.index]
+
+    @response_time.setter
+    def response_time(self, value: float) -> None:
+        self.table.response_times[self.index] = value
+
+    @property
+    def download_speed(self) -> float:
+        return self.table.download_speeds[self.index]
+
+    @download_speed.setter
+    def download_speed(self, value: float) -> None:
+        self.table.download_speeds[self.index] = value
+
+
+class ChannelTable:
+    """
+    列式频道存储（结构数组）
+
+    - 名称驻留（同名频道共用一个字符串），URL只存一份（去重键与URL相同时共用同一对象）
+    - 分组名、连接端点(host:port)驻留为编号，列中只保存整数；URL预解析信息按URL共享
+    - 状态/延迟/速度使用array紧凑存储，不再为每个频道创建浮点对象
+    各处理阶段通过行号数组操作，只在测速、导出时按需生成ChannelRow视图。
+    """
+
+    DEFAULT_CATEGORY = "未分类"
+
+    def __init__(self):
+        self.names: List[str] = []
+        self._name_pool: Dict[str, str] = {}
+        self.urls: List[str] = []
+        self.keys: List[str] = []
+        self.infos: List[UrlInfo] = []
+        self.categories: List[str] = []
+        self._category_ids: Dict[str, int] = {}
+        self.hosts: List[str] = []
+        self._host_ids: Dict[str, int] = {}
+        self.category_ids = array('I')
+        self.original_category_ids = array('I')
+        self.host_ids = array('I')
+        self.status_ids = array('B')
+        self.response_times = array('d')
+        self.download_speeds = array('d')
+        self._default_category = self.intern_category(self.DEFAULT_CATEGORY)
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    @classmethod
+    def from_channels(cls, channels: Iterable[Channel]) -> 'ChannelTable':
+        """从频道对象构建"""
+        table = cls()
+        for channel in channels:
+            table.append(channel.name, channel.url, channel.original_category, channel.dedup_key, channel.info)
+        return table
+
+    def intern_category(self, category: Optional[str]) -> int:
+        """分组名驻留为编号"""
+        if not category:
+            return self._default_category
+        category_id = self._category_ids.get(category)
+        if category_id is None:
+            category_id = self._category_ids[category] = len(self.categories)
+            self.categories.append(category)
+        return category_id
+
+    def _intern_host(self, info: UrlInfo) -> int:
+        """连接端点(host:port)驻留为编号"""
+        host = info.endpoint
+        host_id = self._host_ids.get(host)
+        if host_id is None:
+            host_id = self._host_ids[host] = len(self.hosts)
+            self.hosts.append(host)
+        return host_id
+
+    def append(self, name: str, url: str, original_category: Optional[str] = None,
+               dedup_key: str = "", info: Optional[UrlInfo] = None) -> int:
+        """追加一行，返回行号"""
+        info = info or UrlInfo.from_url(url)
+        category_id = self.intern_category(original_category)
+        self.names.append(self._name_pool.setdefault(name, name))
+        self.urls.append(url)
+        self.keys.append(dedup_key or url)
+        self.infos.append(info)
+        self.category_ids.append(self._default_category)
+        self.original_category_ids.append(category_id)
+        self.host_ids.append(self._intern_host(info))
+        self.status_ids.append(0)
+        self.response_times.append(0.0)
+        self.download_speeds.append(0.0)
+        return len(self.urls) - 1
+
+    def extend(self, records: Iterable[Sequence[str]]) -> None:
+        """批量追加解析记录 (名称, URL, 原始分组, 去重键, URL信息)"""
+        for name, url, category, key, info in records:
+            self.append(name, url, category, key, info)
+
+    def row(self, index: int) -> ChannelRow:
+        return ChannelRow(self, index)
+
+    def rows(self, indices: Optional[Iterable[int]] = None) -> List[ChannelRow]:
+        """生成行视图列表（默认全部行）"""
+        if indices is None:
+            indices = range(len(self))
+        return [ChannelRow(self, i) for i in indices]
+
+    def to_channel(self, index: int) -> Channel:
+        """将单行还原为Channel对象"""
+        return Channel(
+            name=self.names[index],
+            url=self.urls[index],
+            category=self.categories[self.category_ids[index]],
+            original_category=self.categories[self.original_category_ids[index]],
+            status=STATUSES[self.status_ids[index]],
+            response_time=self.response_times[index],
+            download_speed=self.download_speeds[index],
+            dedup_key=self.keys[index],
+            info=self.infos[index]
+        )
+
+    def unique(self, indices: Optional[Iterable[int]] = None) -> array:
+        """
+        按去重键去重
+        与remove_duplicates一致：保留首次出现的位置，取最后一次出现的行
+        """
+        if indices is None:
+            indices = range(len(self))
+        keys = self.keys
+        latest: Dict[str, int] = {}
+        for i in indices:
+            latest[keys[i]] = i
+        return array('I', latest.values())
+
+    def filter_blacklist(self, indices: Iterable[int], blacklist) -> array:
+        """黑名单过滤，返回未命中的行号"""
+        if not blacklist:
+            return array('I', indices)
+        names, urls, match = self.names, self.urls, blacklist.match
+        return array('I', (i for i in indices if not match(names[i], urls[i])))
+
+    def classify(self, indices: Iterable[int], matcher) -> None:
+        """分类并标准化名称（相同名称只匹配一次）"""
+        names = self.names
+        indices = list(indices)
+        mapping = matcher.batch_match(list(dict.fromkeys(names[i] for i in indices)))
+        category_ids: Dict[str, int] = {}
+        for i in indices:
+            name = names[i]
+            category = mapping[name]
+            if (category_id := category_ids.get(category)) is None:
+                category_id = category_ids[category] = self.intern_category(category)
+            self.category_ids[i] = category_id
+            names[i] = matcher.normalize_channel_name(name)
+
+    def sort_by_template(self, indices: Iterable[int], matcher, whitelist) -> array:
+        """按模板顺序排序（沿用匹配器的排序规则），返回排序后的行号"""
+        rows = matcher.sort_channels_by_template(self.rows(indices), whitelist)
+        return array('I', (row.index for row in rows))
@@ -0,0 +1,155 @@
+import re
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from .automaton import AhoCorasick
+from .cache import file_digest, read_cache, write_cache
+
+logger = logging.getLogger(__name__)
+
+# 正则元字符（不含这些字符的模板条目按字面量处理）
+REGEX_METACHARS = frozenset('.^$*+?{}[]\\|()')
+
+_ALNUM_CJK_SPACE = re.compile(r'([a-zA-Z0-9]+)\s+([\u4e00-\u9fa5])')
+_MULTI_SPACE = re.compile(r'\s+')
+
+def clean_channel_name(name: str) -> str:
+    """清理频道名称：去除首尾空格，统一分隔符，移除字母/数字与汉字之间的空格并合并空白"""
+    cleaned = name.strip().replace('_', ' ').replace('-', ' ')
+    cleaned = _ALNUM_CJK_SPACE.sub(r'\1\2', cleaned)
+    return _MULTI_SPACE.sub(' ', cleaned)
+
+def literal_form(pattern: str) -> Optional[str]:
+    """
+    求与正则search等价的子串（无法化简时返回None）
+
+    - 不含元字符的条目本身即为子串
+    - 首尾的 ".*" 不影响search结果，可直接去掉
+    - 末尾的 "X+" 在search中等价于子串末尾的单个 "X"（如 "CCTV5+"）
+    """
+    while pattern.startswith('.*'):
+        pattern = pattern[2:]
+    while pattern.endswith('.*') and not pattern.endswith('\\.*'):
+        pattern = pattern[:-2]
+    if len(pattern) >= 2 and pattern[-1] == '+' and pattern[-2] not in REGEX_METACHARS:
+        pattern = pattern[:-1]
+    if not pattern or any(c in REGEX_METACHARS for c in pattern):
+        return None
+    return pattern
+
+
+class CompiledTemplate:
+    """
+    编译后的分类模板（按模板文件顺序确定性构建，可整体缓存）
+
+    - category_order: 分类顺序（即匹配优先级与导出顺序）
+    - rules: 各分类下的规则原文（保持文件顺序）
+    - standard_names: 清理后的别名(小写) -> 标准名称（同一别名以先出现的规则为准，与分类优先级一致）
+    - template_order / order_index: 各分类下标准名称的顺序（排序用）
+    - suffixes: 名称标准化时去除的后缀
+    - literal_index: 可化简为子串的规则（Aho-Corasick，值为从1开始的分类序号）
+    - regex_rules: 其余正则规则 (分类序号, 原文)，按分类顺序排列
+    - digest: 模板文件内容哈希（分类结果缓存以此判断模板是否变化）
+    """
+
+    # 编译结果格式版本（结构变化时递增，使旧缓存失效）
+    FORMAT_VERSION = 2
+    SUFFIX_PATTERN = re.compile(r'#suffixes:(.*)')
+    DEFAULT_SUFFIXES = ["高清", "hd", "综合"]
+
+    def __init__(self):
+        self.category_order: List[str] = []
+        self.rules: Dict[str, List[str]] = {}
+        self.standard_names: Dict[str, str] = {}
+        self.template_order: Dict[str, List[str]] = {}
+        self.order_index: Dict[str, Dict[str, int]] = {}
+        self.suffixes: List[str] = []
+        self.literal_index = AhoCorasick()
+        self.regex_rules: List[Tuple[int, str]] = []
+        self.digest = ''
+
+    @property
+    def rule_count(self) -> int:
+        return sum(len(rules) for rules in self.rules.values())
+
+    @classmethod
+    def load(cls, template_path: str, cache_dir: Optional[str] = None, space_clean: bool = True) -> 'CompiledTemplate':
+        """
+        加载编译后的模板（按模板内容哈希缓存，模板未变化时直接读取缓存）
+
+        参数:
+            template_path: 模板文件路径
+            cache_dir: 缓存目录，为空时每次重新编译
+            space_clean: 是否清理名称空格（影响标准名称映射的键）
+        """
+        digest = file_digest(template_path)
+        key = (cls.FORMAT_VERSION, digest, space_clean)
+        cache_file = Path(cache_dir) / 'compiled_template.pkl' if cache_dir else None
+        if cache_file and (template := read_cache(cache_file, key)) is not None:
+            logger.debug(f"分类模板命中缓存: {cache_file}")
+            return template
+
+        template = cls.compile(template_path, space_clean, digest)
+        if cache_file:
+            write_cache(cache_file, key, template)
+        return template
+
+    @classmethod
+    def compile(cls, template_path: str, space_clean: bool = True, digest: Optional[str] = None) -> 'CompiledTemplate':
+        """按文件顺序单线程编译模板"""
+        template = cls()
+        template.digest = digest or file_digest(template_path)
+        current_category = None
+        with open(template_path, 'r', encoding='utf-8') as f:
+            for raw_line in f:
+                if not template.suffixes and (match := cls.SUFFIX_PATTERN.search(raw_line)):
+                    template.suffixes = [s.strip().lower() for s in match.group(1).split(',') if s.strip()]
+
+                line = raw_line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                if line.endswith(',#genre#'):
+                    current_category = line.split(',')[0]
+                    if current_category not in template.template_order:
+                        template.category_order.append(current_category)
+                        template.template_order[current_category] = []
+                        template.rules[current_category] = []
+                    continue
+                if current_category:
+                    template._add_line(current_category, line, space_clean)
+
+        template.suffixes = template.suffixes or list(cls.DEFAULT_SUFFIXES)
+        template.order_index = {
+            category: {name: i for i, name in enumerate(names)}
+            for category, names in template.template_order.items()
+        }
+        template._build_index()
+        return template
+
+    def _add_line(self, category: str, line: str, space_clean: bool) -> None:
+        """处理单行规则：标准名称|别名1|别名2..."""
+        parts = line.split('|')
+        standard_name = parts[0].strip()
+        self.template_order[category].append(standard_name)
+        for name in parts:
+            name = name.strip()
+            if not name:
+                continue
+            try:
+                re.compile(name)
+            except re.error as e:
+                logger.warning(f"正则编译跳过: {name} ({str(e)})")
+                continue
+            self.rules[category].append(name)
+            clean_name = clean_channel_name(name) if space_clean else name
+            self.standard_names.setdefault(clean_name.lower(), standard_name)
+
+    def _build_index(self) -> None:
+        """构建字面量自动机与正则列表（分类序号从1开始，越小优先级越高）"""
+        for rank, category in enumerate(self.category_order, 1):
+            for rule in self.rules[category]:
+                if literal := literal_form(rule):
+                    self.literal_index.add(literal, rank)
+                else:
+                    self.regex_rules.append((rank, rule))
+        self.literal_index.build()
@@ -1,18 +1,28 @@
 import asyncio
 import aiohttp
 import time
-import re
 import logging
 import os
+import socket
 import gc
-from typing import List, Set, Tuple, Optional, Dict, Callable
+import heapq
+import multiprocessing
+from queue import Empty
+from typing import Any, List, Set, Tuple, Optional, Dict, Callable
 from collections import defaultdict
-from urllib.parse import urlparse
 from configparser import ConfigParser
 from .models import Channel
+from .breaker import CircuitBreaker
+from .urls import DEFAULT_PORTS
+from .resolver import DEFINITIVE_ERRORS, CachingResolver, is_ip_literal
+from .limiter import AimdLimiter
 
 logger = logging.getLogger(__name__)
 
+# 分片测速：工作进程每累计多少条结果或间隔多少秒回传一次
+SHARD_FLUSH_SIZE = 64
+SHARD_FLUSH_INTERVAL = 0.2
+
 class SpeedTester:
     """高性能流媒体测速引擎（完整修复版）"""
 
@@ -22,7 +32,8 @@ class SpeedTester:
                  max_attempts: int = 3,
                  min_download_speed: float = 100.0, 
                  enable_logging: bool = True,
-                 config: Optional[ConfigParser] = None):
+                 config: Optional[ConfigParser] = None,
+                 resolver: Optional[CachingResolver] = None):
         """
         初始化测速器（修复Windows文件描述符限制）
         """
@@ -41,6 +52,11 @@ class SpeedTester:
         self.min_download_speed = max(0.1, min_download_speed)
         self._enable_logging = enable_logging
         self.config = config or ConfigParser()
+        # 共享DNS解析器（为空时使用aiohttp默认解析器，且不进行预解析）
+        self.resolver = resolver
+        self.resolve_hosts = 0
+        self.resolve_failed = 0
+        self.resolve_skipped = 0
 
         # 下载限制配置
         self.max_download_size = self.config.getint(
@@ -52,9 +68,6 @@ class SpeedTester:
         # 初始化日志系统
         self._init_logger()
 
-        # 协议检测
-        self.rtp_udp_pattern = re.compile(r'/(rtp|udp)/', re.IGNORECASE)
-        
         # 协议特定配置
         self.udp_timeout = self.config.getfloat('TESTER', 'udp_timeout', fallback=max(0.5, timeout * 0.3))
         self.http_timeout = self.config.getfloat('TESTER', 'http_timeout', fallback=timeout)
@@ -62,19 +75,56 @@ class SpeedTester:
         self.max_udp_latency = self.config.getint('TESTER', 'max_udp_latency', fallback=300)
         self.max_http_latency = self.config.getint('TESTER', 'max_http_latency', fallback=1000)
         self.max_channels_per_ip = self.config.getint('TESTER', 'max_channels_per_ip', fallback=100)
+        # 探测方式：get=单次GET同时测延迟与速度；head_get=先HEAD测延迟再GET测速度
+        self.probe_mode = self.config.get('TESTER', 'probe_mode', fallback='get').strip().lower()
+        if self.probe_mode not in ('get', 'head_get'):
+            logger.warning(f"未知的探测方式 {self.probe_mode}，使用get")
+            self.probe_mode = 'get'
         
-        # IP防护机制
-        self.failed_ips: Dict[str, int] = defaultdict(int)
-        self.max_failures_per_ip = self.config.getint('PROTECTION', 'max_failures_per_ip', fallback=5)
-        self.blocked_ips: Set[str] = set()
+        # 端点熔断：同一host:port连续连接失败/超时后跳过其余频道
+        self.breaker = CircuitBreaker(
+            threshold=self.config.getint('TESTER', 'breaker_threshold', fallback=3),
+            cooldown=self.config.getfloat('TESTER', 'breaker_cooldown', fallback=60)
+        )
+        # 熔断跳过的频道按各自超时时间累计的节省时间（秒）
+        self.breaker_saved_seconds = 0.0
+
+        # 端点预探测：测速前对去重后的host:port做TCP连接探测
+        self.enable_preprobe = self.config.getboolean('TESTER', 'enable_preprobe', fallback=True)
+        self.preprobe_timeout = self.config.getfloat('TESTER', 'preprobe_timeout', fallback=self.http_timeout)
+        self.preprobe_retries = max(0, self.config.getint('TESTER', 'preprobe_retries', fallback=1))
+        self.preprobe_concurrency = max(1, self.config.getint('TESTER', 'preprobe_concurrency', fallback=200))
+        self.preprobe_endpoints = 0
+        self.preprobe_unreachable = 0
+        self.preprobe_skipped = 0
+
+        # 连接池：keep_alive启用时复用同一端点的连接，limit_per_host限制单端点并发连接数（0为不限）
+        self.keep_alive = self.config.getboolean('TESTER', 'keep_alive', fallback=False)
+        self.limit_per_host = max(0, self.config.getint('TESTER', 'limit_per_host', fallback=0))
+        self.connections_created = 0
+        self.connections_reused = 0
+
+        # 自适应并发：以concurrency为起点，在[min_concurrency, max_concurrency]内按AIMD调整
+        self.limiter: Optional[AimdLimiter] = None
+        self.worker_count = self.concurrency
+        # 分片/分布式测速时各分片回传的 (最终并发, 并发曲线)，主进程自身的limiter不参与测速
+        self.shard_limiters: Dict[int, Tuple[int, List[Tuple[float, int]]]] = {}
+        if self.config.getboolean('TESTER', 'adaptive_concurrency', fallback=False):
+            maximum = self.config.getint('TESTER', 'max_concurrency', fallback=self.concurrency * 4)
+            if os.name == 'nt':
+                maximum = min(maximum, 30)
+            self.limiter = AimdLimiter(
+                initial=self.concurrency,
+                minimum=self.config.getint('TESTER', 'min_concurrency', fallback=max(1, self.concurrency // 4)),
+                maximum=maximum
+            )
+            self.worker_count = self.limiter.maximum
+        # 分片测速：按主机将频道分配到多个进程，各进程运行独立的事件循环与测速器
+        self.test_processes = max(0, self.config.getint('PERFORMANCE', 'test_processes', fallback=0))
+        self.shard_count = 0
         self.ip_cooldown: Dict[str, float] = {}
         self.min_ip_interval = self.config.getfloat('PROTECTION', 'min_ip_interval', fallback=0.5)
         
-        # 并发控制（修复关键）
-        self._active_tasks = 0
-        self._max_active_tasks = self.concurrency
-        self._task_condition = asyncio.Condition()
-        
         # 统计
         self.success_count = 0
         self.total_count = 0
@@ -89,7 +139,8 @@ class SpeedTester:
             def log_method(msg, *args, **kwargs):
                 if self._enable_logging:
                     getattr(self.logger, level)(msg, *args, **kwargs)
-            return log_method
+            # 作为类属性时需为静态方法，否则实例会被当作msg传入
+            return staticmethod(log_method)
         
         self.log = type('LogMethod', (), {
             'debug': make_log_method('debug'),
@@ -103,27 +154,363 @@ class SpeedTester:
                           channels: List[Channel], 
                           progress_cb: Optional[Callable] = None,
                           failed_urls: Optional[Set[str]] = None, 
-                          white_list: Optional[Set[str]] = None) -> None:
+                          white_list: Optional[Set[str]] = None,
+                          result_cb: Optional[Callable[[Channel], None]] = None) -> None:
+        """
+        批量测试频道（固定数量的工作协程从有界队列取频道，任务与内存占用只与并发数相关）
+        test_processes大于1时按主机分片到多个进程测速；result_cb在每个频道得出结果后调用
         """
-        批量测试频道（安全版本，修复文件描述符限制）
+        if self.test_processes > 1:
+            shards = self.partition_by_host(channels, self.test_processes)
+            if len(shards) > 1:
+                await self.test_sharded(channels, shards, progress_cb, failed_urls, white_list, result_cb)
+                return
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.worker_count * 2)
+
+        async def feed() -> None:
+            for channel in channels:
+                await queue.put(channel)
+            await queue.put(None)
+
+        self.log.info(
+            "▶️ 开始测速 | 总数: %d | 并发: %d | 单IP最大频道: %d",
+            len(channels), self.concurrency, self.max_channels_per_ip
+        )
+        feeder = asyncio.create_task(feed())
+        try:
+            await self.test_queue(queue, progress_cb, failed_urls, white_list, result_cb)
+        finally:
+            feeder.cancel()
+
+    @staticmethod
+    def partition_by_host(channels: List[Channel], shard_count: int) -> List[List[int]]:
         """
-        failed_urls = failed_urls or set()
+        按主机分片（同一主机的频道在同一进程，熔断、连接复用与DNS缓存仍然有效）
+        主机按频道数从多到少依次分配给当前频道最少的分片，分片内保持原有顺序；返回各分片的频道下标
+        """
+        hosts: Dict[str, List[int]] = defaultdict(list)
+        for index, channel in enumerate(channels):
+            hosts[channel.info.host].append(index)
+
+        loads = [(0, shard) for shard in range(min(shard_count, len(hosts)))]
+        assignment: Dict[str, int] = {}
+        for host, indexes in sorted(hosts.items(), key=lambda item: -len(item[1])):
+            load, shard = heapq.heappop(loads)
+            assignment[host] = shard
+            heapq.heappush(loads, (load + len(indexes), shard))
+
+        shards: List[List[int]] = [[] for _ in loads]
+        for index, channel in enumerate(channels):
+            shards[assignment[channel.info.host]].append(index)
+        return shards
+
+    async def test_sharded(self,
+                           channels: List[Channel],
+                           shards: List[List[int]],
+                           progress_cb: Optional[Callable] = None,
+                           failed_urls: Optional[Set[str]] = None,
+                           white_list: Optional[Set[str]] = None,
+                           result_cb: Optional[Callable[[Channel], None]] = None) -> None:
+        """
+        多进程分片测速：每个分片一个进程，各自运行事件循环与测速器（并发数均为concurrency），
+        结果按批回传并合并到原频道对象；工作进程不输出逐频道日志，进程异常退出时其未完成的频道判定离线
+        """
+        failed_urls = failed_urls if failed_urls is not None else set()
         white_list = white_list or set()
         progress_cb = progress_cb or (lambda _: None)
-        
-        self.total_count = len(channels)
+
+        self.total_count = 0
         self.success_count = 0
+        self.shard_count = len(shards)
         self.start_time = time.time()
-        
+
+        tester_args, options = self.worker_settings()
+
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        pending: List[Set[int]] = [set(indexes) for indexes in shards]
+        processes = []
+        for shard, indexes in enumerate(shards):
+            items = [(index, channels[index].name, channels[index].url) for index in indexes]
+            process = context.Process(
+                target=_test_shard_worker,
+                args=(shard, items, tester_args, options, self.resolver, white_list, results),
+                daemon=True
+            )
+            process.start()
+            processes.append(process)
+
         self.log.info(
-            "▶️ 开始测速 | 总数: %d | 并发: %d | 单IP最大频道: %d",
-            self.total_count, self.concurrency, self.max_channels_per_ip
+            "▶️ 开始分片测速 | 总数: %d | 进程: %d | 每进程并发: %d | 分片大小: %s",
+            len(channels), len(shards), self.concurrency, "/".join(str(len(indexes)) for indexes in shards)
+        )
+
+        loop = asyncio.get_running_loop()
+        running = set(range(len(shards)))
+        suspect: Set[int] = set()
+        try:
+            while running:
+                try:
+                    kind, shard, payload = await loop.run_in_executor(None, results.get, True, 0.5)
+                except Empty:
+                    # 进程已退出但未发送结束消息：再等待一轮以读完管道中的剩余结果，仍未结束则视为崩溃
+                    for shard in list(running):
+                        if processes[shard].is_alive():
+                            continue
+                        if shard not in suspect:
+                            suspect.add(shard)
+                            continue
+                        logger.error(f"测速分片{shard}异常退出 (exitcode={processes[shard].exitcode})")
+                        self.fail_shard(channels, pending[shard], progress_cb, failed_urls, result_cb)
+                        running.discard(shard)
+                    continue
+
+                if kind == 'results':
+                    self.apply_shard_results(channels, payload, pending[shard], progress_cb, failed_urls, result_cb)
+                elif kind == 'error':
+                    logger.error(f"测速分片{shard}异常: {payload}")
+                else:
+                    self.merge_shard_stats(shard, payload)
+                    self.fail_shard(channels, pending[shard], progress_cb, failed_urls, result_cb)
+                    running.discard(shard)
+        finally:
+            for process in processes:
+                if running:
+                    process.terminate()
+                process.join(timeout=5)
+            results.close()
+            elapsed = time.time() - self.start_time
+            success_rate = (self.success_count / self.total_count) * 100 if self.total_count > 0 else 0
+            self.log.info(
+                "✅ 分片测速完成 | 成功: %d(%.1f%%) | 失败: %d | 熔断端点: %d | 熔断跳过: %d | 连接复用率: %.1f%% | 用时: %.1fs",
+                self.success_count, success_rate,
+                self.total_count - self.success_count,
+                self.breaker.trips, self.breaker.skipped,
+                self.connection_reuse_ratio * 100,
+                elapsed
+            )
+
+    def worker_settings(self, test_processes: int = 0) -> Tuple[Dict[str, Any], Dict[str, Dict[str, str]]]:
+        """分片/分布式工作节点创建测速器所需的 (构造参数, 配置字典)，工作节点的test_processes由调用方指定"""
+        tester_args = {
+            'timeout': self.timeout,
+            'concurrency': self.concurrency,
+            'max_attempts': self.max_attempts,
+            'min_download_speed': self.min_download_speed,
+        }
+        options = {section: dict(self.config.items(section, raw=True)) for section in self.config.sections()}
+        options.setdefault('PERFORMANCE', {})['test_processes'] = str(test_processes)
+        return tester_args, options
+
+    def apply_shard_results(self,
+                            channels: List[Channel],
+                            results: List[Tuple[int, str, float, float]],
+                            pending: Set[int],
+                            progress_cb: Callable,
+                            failed_urls: Set[str],
+                            result_cb: Optional[Callable[[Channel], None]] = None) -> None:
+        """
+        将分片回传的 (下标, 状态, 延迟, 速度) 合并到原频道对象（只接受pending中的下标，重复结果忽略）
+        状态不是online/offline的结果丢弃，对应频道保持待测，分片结束或租约超时后按未完成处理
+        """
+        applied = 0
+        for index, status, response_time, download_speed in results:
+            if index not in pending:
+                continue
+            if status not in ('online', 'offline'):
+                logger.warning(f"丢弃无效测速结果: 下标 {index} | 状态 {status!r}")
+                continue
+            pending.discard(index)
+            channel = channels[index]
+            channel.status = status
+            channel.response_time = response_time
+            channel.download_speed = download_speed
+            if status == 'online':
+                self.success_count += 1
+            else:
+                failed_urls.add(channel.url)
+            if result_cb:
+                result_cb(channel)
+            applied += 1
+        self.total_count += applied
+        progress_cb(applied)
+
+    def fail_shard(self, channels, indexes, progress_cb, failed_urls, result_cb=None) -> None:
+        """将分片中未回传结果的频道判定离线"""
+        for index in indexes:
+            channel = channels[index]
+            channel.status = 'offline'
+            failed_urls.add(channel.url)
+            if result_cb:
+                result_cb(channel)
+        self.total_count += len(indexes)
+        progress_cb(len(indexes))
+        indexes.clear()
+
+    def shard_stats(self) -> Dict[str, Any]:
+        """分片测速结束后回传给主进程/协调器的统计"""
+        return {
+            'total': self.total_count,
+            'success': self.success_count,
+            'elapsed': time.time() - self.start_time,
+            'breaker_trips': self.breaker.trips,
+            'breaker_skipped': self.breaker.skipped,
+            'breaker_saved_seconds': self.breaker_saved_seconds,
+            'connections_created': self.connections_created,
+            'connections_reused': self.connections_reused,
+            'limiter_decreases': self.limiter.decreases if self.limiter else 0,
+            'limiter_current': self.limiter.current if self.limiter else 0,
+            'limiter_curve': list(self.limiter.curve) if self.limiter else [],
+        }
+
+    def merge_shard_stats(self, shard: int, stats: Dict[str, Any]) -> None:
+        """合并工作进程的熔断、连接与自适应并发统计"""
+        self.breaker.trips += stats['breaker_trips']
+        self.breaker.skipped += stats['breaker_skipped']
+        self.breaker_saved_seconds += stats['breaker_saved_seconds']
+        self.connections_created += stats['connections_created']
+        self.connections_reused += stats['connections_reused']
+        if self.limiter:
+            self.limiter.decreases += stats['limiter_decreases']
+            if stats['limiter_curve']:
+                self.shard_limiters[shard] = (stats['limiter_current'], stats['limiter_curve'])
+        self.log.debug(
+            "分片%d完成 | 频道: %d | 成功: %d | 用时: %.1fs",
+            shard, stats['total'], stats['success'], stats['elapsed']
+        )
+
+    async def preresolve(self,
+                         channels: List[Channel],
+                         failed_urls: Optional[Set[str]] = None,
+                         white_list: Optional[Set[str]] = None) -> List[Channel]:
+        """
+        DNS预解析：并发解析所有频道去重后的主机名，确定无法解析（域名不存在）的主机上的频道直接判定离线，返回仍需测速的频道
+        （需配置共享解析器，解析结果缓存后供预探测与测速复用）
+        """
+        if self.resolver is None:
+            return channels
+        hosts = {channel.info.host for channel in channels if not is_ip_literal(channel.info.host)}
+        unresolved = await self.resolver.resolve_all(hosts, self.preprobe_concurrency)
+        remaining, skipped = self._skip_channels(
+            channels, lambda channel: channel.info.host in unresolved, failed_urls, white_list
+        )
+        self.resolve_hosts = len(hosts)
+        self.resolve_failed = len(unresolved)
+        self.resolve_skipped = skipped
+        return remaining
+
+    async def preprobe(self,
+                       channels: List[Channel],
+                       failed_urls: Optional[Set[str]] = None,
+                       white_list: Optional[Set[str]] = None) -> List[Channel]:
+        """
+        端点可达性预探测：不可达端点上的频道直接判定离线，返回仍需测速的频道
+
+        只探测TCP协议（HTTP/HTTPS/RTSP）且端口已知的端点，其余端点视为可达；白名单频道不受影响。
+        """
+        endpoints: Dict[str, Tuple[str, int]] = {}
+        for channel in channels:
+            info = channel.info
+            if info.port and info.scheme in DEFAULT_PORTS:
+                endpoints.setdefault(info.endpoint, (info.host.strip('[]'), info.port))
+
+        unreachable: Set[str] = set()
+        pending = iter(endpoints.items())
+
+        async def worker() -> None:
+            for endpoint, (host, port) in pending:
+                if not await self._connectable(host, port):
+                    unreachable.add(endpoint)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.preprobe_concurrency, len(endpoints)))))
+
+        remaining, skipped = self._skip_channels(
+            channels, lambda channel: channel.info.endpoint in unreachable, failed_urls, white_list
         )
+        self.preprobe_endpoints = len(endpoints)
+        self.preprobe_unreachable = len(unreachable)
+        self.preprobe_skipped = skipped
+        return remaining
+
+    def _skip_channels(self,
+                       channels: List[Channel],
+                       should_skip: Callable[[Channel], bool],
+                       failed_urls: Optional[Set[str]],
+                       white_list: Optional[Set[str]]) -> Tuple[List[Channel], int]:
+        """将满足条件的频道判定离线（白名单频道除外），返回 (仍需测速的频道, 跳过数)"""
+        failed_urls = failed_urls if failed_urls is not None else set()
+        white_list = white_list or set()
+        remaining = []
+        skipped = 0
+        for channel in channels:
+            if should_skip(channel) and not self._is_in_white_list(channel, white_list):
+                channel.status = 'offline'
+                failed_urls.add(channel.url)
+                skipped += 1
+            else:
+                remaining.append(channel)
+        return remaining, skipped
+
+    async def _connectable(self, host: str, port: int) -> bool:
+        """
+        TCP连接探测（连接建立后立即关闭）
 
-        # 创建自定义connector（关键修复）
+        配置了共享解析器时依次尝试其解析出的全部地址，任一地址连通即视为可达；
+        全部失败时重试preprobe_retries轮，避免单个丢包误判整个端点。
+        """
+        addresses = [host]
+        if self.resolver is not None and not is_ip_literal(host):
+            try:
+                records = await self.resolver.resolve(host, port, socket.AF_UNSPEC)
+            except socket.gaierror as e:
+                return e.errno not in DEFINITIVE_ERRORS
+            except OSError:
+                return True
+            addresses = list(dict.fromkeys(record['host'] for record in records))
+
+        for _ in range(1 + self.preprobe_retries):
+            for address in addresses:
+                try:
+                    _, writer = await asyncio.wait_for(asyncio.open_connection(address, port), self.preprobe_timeout)
+                except socket.gaierror as e:
+                    # 未配置共享解析器时由open_connection自行解析：与上面相同，只有确定性失败才判定不可达
+                    if e.errno not in DEFINITIVE_ERRORS:
+                        return True
+                    continue
+                except (OSError, asyncio.TimeoutError):
+                    continue
+                writer.close()
+                try:
+                    await asyncio.wait_for(writer.wait_closed(), self.preprobe_timeout)
+                except (OSError, asyncio.TimeoutError):
+                    pass
+                return True
+        return False
+
+    async def test_queue(self,
+                         queue: asyncio.Queue,
+                         progress_cb: Optional[Callable] = None,
+                         failed_urls: Optional[Set[str]] = None,
+                         white_list: Optional[Set[str]] = None,
+                         result_cb: Optional[Callable[[Channel], None]] = None) -> None:
+        """
+        持续从队列取出频道测速（队列中的None表示输入结束）
+        """
+        failed_urls = failed_urls if failed_urls is not None else set()
+        white_list = white_list or set()
+        progress_cb = progress_cb or (lambda _: None)
+
+        self.total_count = 0
+        self.success_count = 0
+        self.start_time = time.time()
+
+        # 创建自定义connector（未启用长连接时每个请求使用独立连接）
         connector = aiohttp.TCPConnector(
-            limit=self.concurrency,
-            force_close=True,
+            limit=self.worker_count,
+            limit_per_host=self.limit_per_host,
+            resolver=self.resolver,
+            force_close=not self.keep_alive,
             enable_cleanup_closed=True,
             ssl=False
         )
@@ -131,68 +518,70 @@ class SpeedTester:
         try:
             async with aiohttp.ClientSession(
                 connector=connector,
-                timeout=aiohttp.ClientTimeout(total=self.timeout)
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                trace_configs=[self._connection_trace()]
             ) as session:
-                # 使用带限制的批处理
-                await self._process_batch_with_limits(
-                    session, channels, progress_cb, failed_urls, white_list
-                )
-                
-        except Exception as e:
-            self.log.error("测试过程中发生错误: %s", str(e))
-            if "_abort" not in str(e):
-                raise
+                await asyncio.gather(*(
+                    self._queue_worker(session, queue, progress_cb, failed_urls, white_list, result_cb)
+                    for _ in range(self.worker_count)
+                ))
         finally:
             await connector.close()
             elapsed = time.time() - self.start_time
             success_rate = (self.success_count / self.total_count) * 100 if self.total_count > 0 else 0
             self.log.info(
-                "✅ 测速完成 | 成功: %d(%.1f%%) | 失败: %d | 屏蔽IP: %d | 用时: %.1fs",
+                "✅ 测速完成 | 成功: %d(%.1f%%) | 失败: %d | 熔断端点: %d | 熔断跳过: %d | 连接复用率: %.1f%% | 用时: %.1fs",
                 self.success_count, success_rate,
                 self.total_count - self.success_count,
-                len(self.blocked_ips),
+                self.breaker.trips, self.breaker.skipped,
+                self.connection_reuse_ratio * 100,
                 elapsed
             )
 
-    async def _process_batch_with_limits(self, session, channels, progress_cb, failed_urls, white_list):
-        """带连接数限制的批处理"""
-        tasks = []
-        for channel in channels:
-            # 等待可用槽位
-            async with self._task_condition:
-                await self._task_condition.wait_for(
-                    lambda: self._active_tasks < self._max_active_tasks
-                )
-                self._active_tasks += 1
-            
-            # 创建任务
-            task = asyncio.create_task(
-                self._test_single_channel_limited(session, channel, progress_cb, failed_urls, white_list)
-            )
-            tasks.append(task)
-        
-        # 安全执行，避免异常传播
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        # 处理异常结果
-        for result in results:
-            if isinstance(result, Exception):
-                self.log.error("任务执行异常: %s", str(result))
+    @property
+    def connection_reuse_ratio(self) -> float:
+        """连接复用率（复用次数 / 取得连接总次数）"""
+        total = self.connections_created + self.connections_reused
+        return self.connections_reused / total if total else 0.0
 
-    async def _test_single_channel_limited(self, session, channel, progress_cb, failed_urls, white_list):
-        """带资源限制的单频道测试"""
-        try:
-            await self._test_single_channel(session, channel, progress_cb, failed_urls, white_list)
-        except Exception as e:
-            self.log.error("频道测试异常 %s: %s", channel.name, str(e))
-            failed_urls.add(channel.url)
-            channel.status = 'offline'
-        finally:
-            # 释放槽位
-            async with self._task_condition:
-                self._active_tasks -= 1
-                self._task_condition.notify_all()
-            progress_cb(1)
+    def _connection_trace(self) -> aiohttp.TraceConfig:
+        """统计新建与复用的连接数"""
+        async def on_create(session, context, params) -> None:
+            self.connections_created += 1
+
+        async def on_reuse(session, context, params) -> None:
+            self.connections_reused += 1
+
+        trace = aiohttp.TraceConfig()
+        trace.on_connection_create_end.append(on_create)
+        trace.on_connection_reuseconn.append(on_reuse)
+        return trace
+
+    async def _queue_worker(self, session, queue, progress_cb, failed_urls, white_list, result_cb=None) -> None:
+        """工作协程：逐个取出频道测速，直到遇到结束标记（自适应模式下先取得并发名额）"""
+        while True:
+            if self.limiter:
+                await self.limiter.acquire()
+            try:
+                channel = await queue.get()
+                if channel is None:
+                    # 放回结束标记，通知其他工作协程
+                    await queue.put(None)
+                    return
+                self.total_count += 1
+                try:
+                    await self._test_single_channel(session, channel, progress_cb, failed_urls, white_list)
+                except Exception as e:
+                    self.log.error("频道测试异常 %s: %s", channel.name, str(e))
+                    failed_urls.add(channel.url)
+                    channel.status = 'offline'
+                finally:
+                    if result_cb:
+                        result_cb(channel)
+                    progress_cb(1)
+            finally:
+                if self.limiter:
+                    self.limiter.release()
 
     async def _test_single_channel(self,
                                  session: aiohttp.ClientSession,
@@ -206,9 +595,11 @@ class SpeedTester:
             self.log.debug("🟢 白名单跳过 %s", channel.name)
             return
 
-        if channel.url in self.blocked_ips:
+        if not self.breaker.allow(channel.info.endpoint):
             channel.status = 'offline'
             failed_urls.add(channel.url)
+            self.breaker_saved_seconds += self.udp_timeout if channel.info.udp else self.http_timeout
+            self.log.debug("⛔ 熔断跳过 %s", channel.name)
             return
 
         try:
@@ -234,42 +625,95 @@ class SpeedTester:
         """统一测试方法（支持UDP/HTTP协议）"""
         try:
             headers = {'User-Agent': 'Mozilla/5.0'}
-            is_udp = self._is_udp_url(channel.url)
+            is_udp = channel.info.udp
             timeout_val = self.udp_timeout if is_udp else self.http_timeout
             
             # 协议阈值
             min_speed = self.min_udp_download_speed if is_udp else self.min_download_speed
             max_latency = self.max_udp_latency if is_udp else self.max_http_latency
 
-            # 阶段1：快速HEAD请求测延迟
-            latency_start = time.perf_counter()
-            async with session.head(channel.url, headers=headers, timeout=timeout_val) as resp:
-                latency = (time.perf_counter() - latency_start) * 1000
-                if latency > max_latency or resp.status != 200:
-                    return False, 0.0, latency
+            probe = self._probe_get if self.probe_mode == 'get' else self._probe_head_get
+            started = time.monotonic()
+            result = await probe(session, channel.url, headers, timeout_val, min_speed, max_latency)
+            self.breaker.record_success(channel.info.endpoint)
+            if self.limiter:
+                self.limiter.record(started, failed=False, latency=result[2])
+            return result
+
+        except (asyncio.TimeoutError, aiohttp.ClientConnectionError):
+            # 未收到响应的连接失败/超时计入熔断与自适应并发
+            self.breaker.record_failure(channel.info.endpoint)
+            if self.limiter:
+                self.limiter.record(started, failed=True)
+            return False, 0.0, 0.0
+        except aiohttp.ClientError:
+            # 已收到响应（如响应格式错误），端点本身可达
+            self.breaker.record_success(channel.info.endpoint)
+            return False, 0.0, 0.0
+        except Exception:
+            # 非网络异常不说明端点状态，但须释放半开探测名额，否则该端点在本次运行中一直被跳过
+            self.breaker.release_probe(channel.info.endpoint)
+            return False, 0.0, 0.0
+
+    async def _probe_get(self, session, url, headers, timeout_val, min_speed, max_latency) -> Tuple[bool, float, float]:
+        """
+        单次GET探测：响应头到达时间超限即放弃，首字节到达时间作为延迟，
+        同一响应体读取到max_download_size为止计算速度
+        （收到响应头后的超时/断开按测速失败返回，不抛出，熔断只统计连接阶段的失败）
+        """
+        start = time.perf_counter()
+        async with session.get(url, headers=headers, timeout=timeout_val) as resp:
+            header_latency = (time.perf_counter() - start) * 1000
+            if header_latency > max_latency or resp.status != 200:
+                return False, 0.0, header_latency
 
-            # 阶段2：GET请求测速度（复用连接）
-            start = time.perf_counter()
             content_size = 0
-            
+            first_byte = 0.0
+            try:
+                async for chunk in resp.content.iter_chunked(1024 * 4):
+                    if not content_size:
+                        first_byte = time.perf_counter()
+                    content_size += len(chunk)
+                    if content_size >= self.max_download_size:
+                        break
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError):
+                return False, 0.0, header_latency
+
+            if not content_size:
+                return False, 0.0, header_latency
+            latency = (first_byte - start) * 1000
+            duration = time.perf_counter() - start
+            speed = content_size / duration / 1024 if duration > 0 else 0
+            self.log.debug("📶 %s | 响应头: %.0fms | 首字节: %.0fms", self._simplify_url(url), header_latency, latency)
+            return speed >= min_speed, speed, latency
+
+    async def _probe_head_get(self, session, url, headers, timeout_val, min_speed, max_latency) -> Tuple[bool, float, float]:
+        """HEAD+GET探测：先HEAD测延迟，再GET测速度（HEAD成功后的超时/断开按测速失败返回）"""
+        # 阶段1：快速HEAD请求测延迟
+        latency_start = time.perf_counter()
+        async with session.head(url, headers=headers, timeout=timeout_val) as resp:
+            latency = (time.perf_counter() - latency_start) * 1000
+            if latency > max_latency or resp.status != 200:
+                return False, 0.0, latency
+
+        # 阶段2：GET请求测速度
+        start = time.perf_counter()
+        content_size = 0
+        
+        try:
             # 使用iter_chunked分块读取，避免一次性加载大文件
-            async with session.get(channel.url, headers=headers, timeout=timeout_val) as resp:
+            async with session.get(url, headers=headers, timeout=timeout_val) as resp:
                 async for chunk in resp.content.iter_chunked(1024 * 4):  # 4KB chunks
                     content_size += len(chunk)
                     # 达到最大下载量时提前结束
                     if content_size >= self.max_download_size:
                         break
-                
-                duration = time.perf_counter() - start
-                speed = content_size / duration / 1024 if duration > 0 else 0
-                return speed >= min_speed, speed, latency
-
-        except asyncio.TimeoutError:
-            return False, 0.0, 0.0
-        except aiohttp.ClientError:
-            return False, 0.0, 0.0
-        except Exception:
-            return False, 0.0, 0.0
+        except (asyncio.TimeoutError, aiohttp.ClientConnectionError):
+            return False, 0.0, latency
+            
+        duration = time.perf_counter() - start
+        speed = content_size / duration / 1024 if duration > 0 else 0
+        return speed >= min_speed, speed, latency
 
     def _handle_success(self,
                       channel: Channel,
@@ -281,7 +725,7 @@ class SpeedTester:
         channel.response_time = latency
         channel.download_speed = speed
         
-        protocol = "UDP" if self._is_udp_url(channel.url) else "HTTP"
+        protocol = "UDP" if channel.info.udp else "HTTP"
         self.log.info(
             "✅ 成功 | %-5s | %-30s | %6.1fKB/s | %4.0fms | %s",
             protocol, channel.name[:30], speed, latency,
@@ -296,10 +740,8 @@ class SpeedTester:
         """处理失败结果"""
         failed_urls.add(channel.url)
         channel.status = 'offline'
-        ip = self._extract_ip_from_url(channel.url)
-        self.failed_ips[ip] += 1
         
-        is_udp = self._is_udp_url(channel.url)
+        is_udp = channel.info.udp
         reason = (
             "速度不足" if speed > 0 and speed < (
                 self.min_udp_download_speed if is_udp else self.min_download_speed
@@ -323,8 +765,6 @@ class SpeedTester:
         """处理超时"""
         failed_urls.add(channel.url)
         channel.status = 'offline'
-        ip = self._extract_ip_from_url(channel.url)
-        self.failed_ips[ip] += 1
         
         self.log.warning(
             "⏰ 超时 | %-30s | %s",
@@ -339,8 +779,6 @@ class SpeedTester:
         """处理客户端错误"""
         failed_urls.add(channel.url)
         channel.status = 'offline'
-        ip = self._extract_ip_from_url(channel.url)
-        self.failed_ips[ip] += 1
         
         self.log.error(
             "🌐 客户端错误 | %-30s | %-20s | %s",
@@ -355,8 +793,6 @@ class SpeedTester:
         """处理异常"""
         failed_urls.add(channel.url)
         channel.status = 'offline'
-        ip = self._extract_ip_from_url(channel.url)
-        self.failed_ips[ip] += 1
         
         self.log.error(
             "‼️ 异常 | %-30s | %-20s | %s",
@@ -364,23 +800,6 @@ class SpeedTester:
             self._simplify_url(channel.url)
         )
 
-    def _is_udp_url(self, url: str) -> bool:
-        """判断是否为UDP协议URL"""
-        url_lower = url.lower()
-        return (url_lower.startswith(('udp://', 'rtp://')) or 
-                bool(self.rtp_udp_pattern.search(url_lower)))
-
-    def _extract_ip_from_url(self, url: str) -> str:
-        """从URL提取IP地址"""
-        try:
-            parsed = urlparse(url)
-            netloc = parsed.netloc.split('@')[-1]
-            if '[' in netloc and ']' in netloc:  # IPv6
-                return netloc.split(']')[0] + ']'
-            return netloc.split(':')[0]  # IPv4
-        except:
-            return "unknown"
-
     def _simplify_url(self, url: str) -> str:
         """简化URL显示"""
         return url[:100] + '...' if len(url) > 100 else url
@@ -413,7 +832,7 @@ class SpeedTester:
             if self._is_in_white_list(ch, white_list):
                 continue
                 
-            ip = self._extract_ip_from_url(ch.url)
+            ip = ch.info.host
             group_idx = ip_counter[ip] // self.max_channels_per_ip
             group_key = f"{ip}_{group_idx}"
             
@@ -427,8 +846,40 @@ class SpeedTester:
 
     def clear_resources(self):
         """清理资源"""
-        self.failed_ips.clear()
-        self.blocked_ips.clear()
+        self.breaker.clear()
+        self.breaker_saved_seconds = 0.0
         self.ip_cooldown.clear()
-        self._active_tasks = 0
-        gc.collect()
\ No newline at end of file
+        gc.collect()
+
+def _test_shard_worker(shard: int,
+                       items: List[Tuple[int, str, str]],
+                       tester_args: Dict[str, Any],
+                       options: Dict[str, Dict[str, str]],
+                       resolver: Optional[CachingResolver],
+                       white_list: Set[str],
+                       results) -> None:
+    """分片测速进程入口：测试 (下标, 名称, URL) 列表，按批回传 (下标, 状态, 延迟, 速度)，最后回传统计"""
+    config = ConfigParser()
+    config.read_dict(options)
+    tester = SpeedTester(enable_logging=False, config=config, resolver=resolver, **tester_args)
+    channels = [Channel(name=name, url=url) for _, name, url in items]
+    positions = {id(channel): index for channel, (index, _, _) in zip(channels, items)}
+    buffer: List[Tuple[int, str, float, float]] = []
+    last_flush = time.monotonic()
+
+    def collect(channel: Channel) -> None:
+        nonlocal last_flush
+        buffer.append((positions[id(channel)], channel.status, channel.response_time, channel.download_speed))
+        now = time.monotonic()
+        if len(buffer) >= SHARD_FLUSH_SIZE or now - last_flush >= SHARD_FLUSH_INTERVAL:
+            results.put(('results', shard, buffer[:]))
+            buffer.clear()
+            last_flush = now
+
+    try:
+        asyncio.run(tester.test_channels(channels, None, set(), white_list, collect))
+    except Exception as e:
+        results.put(('error', shard, str(e)))
+    if buffer:
+        results.put(('results', shard, buffer))
+    results.put(('done', shard, tester.shard_stats()))
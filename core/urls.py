@@ -0,0 +1,95 @@
+import re
+import sys
+from typing import AbstractSet
+from urllib.parse import SplitResult, urlsplit
+
+# 各协议默认端口（规范化时省略）
+DEFAULT_PORTS = {'http': 80, 'https': 443, 'rtsp': 554}
+
+def canonical_url(parsed: SplitResult, drop_params: AbstractSet[str] = frozenset()) -> str:
+    """
+    生成URL规范形式（仅用作去重键，不用于实际请求）
+
+    - 协议与主机名转小写，省略默认端口
+    - 空路径统一为 "/"
+    - 查询参数去掉drop_params（按小写参数名比较）后排序
+    - 去掉片段(#...)
+    """
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc
+    userinfo, at, hostport = netloc.rpartition('@')
+    hostport = hostport.lower()
+
+    if hostport.startswith('['):
+        host_end = hostport.find(']') + 1
+        host, port = hostport[:host_end], hostport[host_end + 1:]
+    else:
+        host, _, port = hostport.partition(':')
+    if port.isdigit() and DEFAULT_PORTS.get(scheme) == int(port):
+        port = ''
+    netloc = f"{userinfo}{at}{host}:{port}" if port else f"{userinfo}{at}{host}"
+
+    query = ''
+    if parsed.query:
+        pairs = [
+            pair for pair in parsed.query.split('&')
+            if pair and pair.split('=', 1)[0].lower() not in drop_params
+        ]
+        query = '&'.join(sorted(pairs))
+
+    url = f"{scheme}://{netloc}{parsed.path or '/'}"
+    return f"{url}?{query}" if query else url
+
+
+class UrlInfo:
+    """
+    URL预解析信息（解析时每个URL只计算一次）
+
+    测速分组、协议阈值与IPv4/IPv6导出直接读取这些属性，无需重复解析URL。
+    """
+    __slots__ = ['scheme', 'host', 'port', 'ipv6', 'udp']
+
+    # 组播转HTTP代理（udpxy等）的路径特征
+    UDP_PATH_PATTERN = re.compile(r'/(rtp|udp)/', re.IGNORECASE)
+    UDP_SCHEMES = frozenset({'udp', 'rtp'})
+
+    def __init__(self, scheme: str = '', host: str = '', port: int = 0, ipv6: bool = False, udp: bool = False):
+        self.scheme = scheme
+        self.host = host      # 主机名或IP（小写，IPv6保留方括号）
+        self.port = port      # 显式端口或协议默认端口，未知时为0
+        self.ipv6 = ipv6
+        self.udp = udp        # UDP组播源（含udpxy代理地址）
+
+    def __repr__(self) -> str:
+        return f"UrlInfo({self.scheme}://{self.endpoint}, ipv6={self.ipv6}, udp={self.udp})"
+
+    @property
+    def endpoint(self) -> str:
+        """host:port 形式的连接端点"""
+        return f"{self.host}:{self.port}" if self.port else self.host
+
+    @classmethod
+    def from_split(cls, parsed: SplitResult, url: str) -> 'UrlInfo':
+        """从已解析的URL构造（url用于检测代理路径特征）"""
+        scheme = parsed.scheme.lower()
+        hostport = parsed.netloc.rpartition('@')[2].lower()
+        if hostport.startswith('['):
+            host_end = hostport.find(']') + 1
+            host, port = hostport[:host_end], hostport[host_end + 1:]
+        else:
+            host, _, port = hostport.partition(':')
+        return cls(
+            scheme=scheme,
+            host=sys.intern(host),
+            port=int(port) if port.isdigit() else DEFAULT_PORTS.get(scheme, 0),
+            ipv6=host.startswith('['),
+            udp=scheme in cls.UDP_SCHEMES or bool(cls.UDP_PATH_PATTERN.search(url))
+        )
+
+    @classmethod
+    def from_url(cls, url: str) -> 'UrlInfo':
+        """从URL字符串构造（无法解析时返回空信息）"""
+        try:
+            return cls.from_split(urlsplit(url), url)
+        except ValueError:
+            return cls()
@@ -3,11 +3,11 @@ import os
 import asyncio
 import configparser
 from pathlib import Path
-from typing import List, Set, Dict, Optional, Tuple, Callable
+from typing import List, Set, Dict, Optional, Sequence, Tuple, Callable
 import re
 import logging
-import gc
 import sys
+import time
 from datetime import datetime
 from collections import defaultdict
 from core import (
@@ -16,9 +16,15 @@ from core import (
     AutoCategoryMatcher,
     SpeedTester,
     ResultExporter,
-    Channel
+    ChannelPipeline,
+    BlacklistIndex,
+    CachingResolver,
+    TestCoordinator,
+    Channel,
+    ChannelTable
 )
 from core.progress import SmartProgress
+from core.limiter import summarize_curve
 
 # ==================== 工具函数 ====================
 def load_list_file(path: str) -> Set[str]:
@@ -37,15 +43,9 @@ def load_urls(path: str) -> List[str]:
     with open(file, 'r', encoding='utf-8') as f:
         return [line.strip() for line in f if line.strip()]
 
-def is_blacklisted(channel: Channel, blacklist: Set[str]) -> bool:
+def is_blacklisted(channel: Channel, blacklist: BlacklistIndex) -> bool:
     """检查频道是否在黑名单中"""
-    channel_name = channel.name.lower()
-    channel_url = channel.url.lower()
-    return any(
-        entry in channel_name or entry in channel_url
-        for entry in blacklist
-        if entry.strip() and not entry.startswith('#')
-    )
+    return blacklist.is_blacklisted(channel)
 
 async def fetch_sources(fetcher: SourceFetcher, urls: List[str], logger: logging.Logger) -> List[str]:
     """获取订阅源内容（带重试）"""
@@ -65,34 +65,67 @@ async def fetch_sources(fetcher: SourceFetcher, urls: List[str], logger: logging
 
 def parse_channels(parser: PlaylistParser, contents: List[str], logger: logging.Logger) -> List[Channel]:
     """解析所有频道"""
-    all_channels = []
     progress = SmartProgress(len(contents), "解析进度")
-    
-    for content in contents:
-        try:
-            channels = list(parser.parse(content))
-            all_channels.extend(channels)
-            
-            if len(all_channels) % 5000 == 0:
-                gc.collect()
-                
-            progress.update()
-        except Exception as e:
-            logger.error(f"解析异常: {str(e)}")
-            continue
-    
+    all_channels = parser.parse_all(contents, progress.update)
     progress.complete()
+    parser.save_cache()
+    if parser.cache_hits:
+        logger.info(f"• 解析缓存命中: {parser.cache_hits}/{len(contents)}个订阅源")
     return all_channels
 
+async def stream_sources(fetcher: SourceFetcher, parser: PlaylistParser, urls: List[str], logger: logging.Logger) -> List[Channel]:
+    """流式获取并解析订阅源（边下载边解析）"""
+    all_channels = []
+    progress = SmartProgress(len(urls), "流式获取解析")
+    async for channel in fetcher.stream_channels(urls, parser, progress.update):
+        all_channels.append(channel)
+    progress.complete()
+    return all_channels
+
+def parse_table(parser: PlaylistParser, contents: List[str], logger: logging.Logger) -> ChannelTable:
+    """解析所有频道到列式存储"""
+    progress = SmartProgress(len(contents), "解析进度")
+    table = ChannelTable()
+    for records in parser.parse_all_records(contents, progress.update):
+        table.extend(records)
+    progress.complete()
+    parser.save_cache()
+    if parser.cache_hits:
+        logger.info(f"• 解析缓存命中: {parser.cache_hits}/{len(contents)}个订阅源")
+    return table
+
+async def stream_table(fetcher: SourceFetcher, parser: PlaylistParser, urls: List[str], logger: logging.Logger) -> ChannelTable:
+    """流式获取并解析订阅源到列式存储"""
+    table = ChannelTable()
+    progress = SmartProgress(len(urls), "流式获取解析")
+    async for channel in fetcher.stream_channels(urls, parser, progress.update):
+        table.append(channel.name, channel.url, channel.original_category, channel.dedup_key, channel.info)
+    progress.complete()
+    return table
+
+def process_table(table: ChannelTable, blacklist: BlacklistIndex, matcher: AutoCategoryMatcher,
+                  logger: logging.Logger) -> Sequence[int]:
+    """列式存储上的去重、黑名单过滤与分类（按行号处理）"""
+    progress = SmartProgress(3, "列式处理")
+    unique_rows = table.unique()
+    progress.update()
+    filtered_rows = table.filter_blacklist(unique_rows, blacklist)
+    progress.update()
+    logger.info(f"✔ 处理完成 | 去重后: {len(unique_rows)} | 过滤后: {len(filtered_rows)}")
+    table.classify(filtered_rows, matcher)
+    progress.update()
+    progress.complete()
+    return filtered_rows
+
 def remove_duplicates(channels: List[Channel], logger: logging.Logger) -> List[Channel]:
     """去重处理"""
     progress = SmartProgress(len(channels), "去重进度")
-    unique_channels = {channel.url: channel for channel in channels}
+    unique_channels = {channel.dedup_key: channel for channel in channels}
     progress.update(len(channels))
     progress.complete()
     return list(unique_channels.values())
 
-def filter_blacklist(channels: List[Channel], blacklist: Set[str], logger: logging.Logger) -> List[Channel]:
+def filter_blacklist(channels: List[Channel], blacklist: BlacklistIndex, logger: logging.Logger) -> List[Channel]:
     """黑名单过滤"""
     if not blacklist:
         return channels
@@ -122,31 +155,38 @@ def classify_channels(matcher: AutoCategoryMatcher, channels: List[Channel], log
     return processed
 
 async def test_channels(tester: SpeedTester, channels: List[Channel], whitelist: Set[str], logger: logging.Logger) -> Set[str]:
-    """测速测试（修复Windows限制）"""
+    """测速测试（测速器内部以固定数量的工作协程调度，无需分批）"""
     if not channels:
         logger.warning("⚠️ 无频道需要测速")
         return set()
 
     failed_urls = set()
-    
-    # Windows系统使用更小的批次大小
-    if os.name == 'nt':
-        batch_size = min(200, len(channels) // 5 or 50)
-    else:
-        batch_size = min(1000, len(channels) // 10 or 100)
-    
+    if tester.resolver:
+        start = time.time()
+        channels = await tester.preresolve(channels, failed_urls, whitelist)
+        logger.info(
+            f"• DNS预解析: {tester.resolve_hosts}个主机 | 无法解析: {tester.resolve_failed} | "
+            f"跳过频道: {tester.resolve_skipped} | 缓存命中: {tester.resolver.hits} | 用时: {time.time() - start:.1f}秒"
+        )
+    if tester.enable_preprobe:
+        start = time.time()
+        channels = await tester.preprobe(channels, failed_urls, whitelist)
+        logger.info(
+            f"• 端点预探测: {tester.preprobe_endpoints}个端点 | 不可达: {tester.preprobe_unreachable} | "
+            f"跳过频道: {tester.preprobe_skipped} | 用时: {time.time() - start:.1f}秒"
+        )
+
     progress = SmartProgress(len(channels), "测速进度")
     
     try:
-        for i in range(0, len(channels), batch_size):
-            batch = channels[i:i+batch_size]
-            await tester.test_channels(batch, progress.update, failed_urls, whitelist)
-            
-            # 批处理间延迟，避免资源耗尽
-            if i + batch_size < len(channels):
-                await asyncio.sleep(1)
-                gc.collect()
-                
+        if tester.config.getboolean('DISTRIBUTED', 'enabled', fallback=False):
+            coordinator = create_coordinator(tester.config, tester)
+            await coordinator.run(channels, progress.update, failed_urls, whitelist)
+            logger.info(f"• 分布式测速: {coordinator.summary()}")
+        else:
+            await tester.test_channels(channels, progress.update, failed_urls, whitelist)
+        if tester.shard_count:
+            logger.info(f"• 分片测速: {tester.shard_count}个进程 | 每进程并发: {tester.concurrency}")
     except Exception as e:
         logger.error(f"测速过程异常: {str(e)}")
     finally:
@@ -154,12 +194,65 @@ async def test_channels(tester: SpeedTester, channels: List[Channel], whitelist:
     
     return failed_urls
 
+async def run_pipeline(pipeline: ChannelPipeline, urls: List[str], logger: logging.Logger) -> Tuple[List[Channel], Set[str]]:
+    """流水线模式：各阶段并发执行"""
+    progress = SmartProgress(len(urls), "流水线(订阅源)")
+    processed, failed_urls = await pipeline.run(urls, progress.update)
+    progress.complete()
+    for line in pipeline.report():
+        logger.info(line)
+    return processed, failed_urls
+
 async def export_results(exporter: ResultExporter, channels: List[Channel], whitelist: Set[str], logger: logging.Logger) -> None:
     """结果导出"""
     progress = SmartProgress(1, "导出进度")
     exporter.export(channels, whitelist, progress.update)  # 同步调用
     progress.complete()
 
+def create_matcher(config: configparser.ConfigParser) -> AutoCategoryMatcher:
+    """创建分类匹配器"""
+    return AutoCategoryMatcher(
+        config.get('PATHS', 'templates_path', fallback='config/templates.txt'),
+        config
+    )
+
+def create_resolver(config: configparser.ConfigParser) -> Optional[CachingResolver]:
+    """创建共享DNS解析器（未启用DNS缓存时返回None）"""
+    if not config.getboolean('PERFORMANCE', 'enable_dns_cache', fallback=True):
+        return None
+    return CachingResolver(
+        ttl=config.getfloat('PERFORMANCE', 'dns_cache_ttl', fallback=3600),
+        negative_ttl=config.getfloat('PERFORMANCE', 'dns_negative_ttl', fallback=300),
+        cache_file=Path(config.get('PATHS', 'cache_dir', fallback='cache')) / 'dns_cache.pkl'
+    )
+
+def create_coordinator(config: configparser.ConfigParser, tester: SpeedTester) -> TestCoordinator:
+    """创建分布式测速协调器"""
+    return TestCoordinator(
+        tester,
+        host=config.get('DISTRIBUTED', 'listen_host', fallback='127.0.0.1'),
+        port=config.getint('DISTRIBUTED', 'listen_port', fallback=8765),
+        token=config.get('DISTRIBUTED', 'token', fallback=''),
+        shard_size=config.getint('DISTRIBUTED', 'shard_size', fallback=500),
+        lease_timeout=config.getfloat('DISTRIBUTED', 'lease_timeout', fallback=60),
+        max_leases=config.getint('DISTRIBUTED', 'max_leases', fallback=3),
+        wait_timeout=config.getfloat('DISTRIBUTED', 'wait_timeout', fallback=300),
+        local_workers=config.getint('DISTRIBUTED', 'local_workers', fallback=0),
+        worker_processes=config.getint('DISTRIBUTED', 'worker_processes', fallback=0)
+    )
+
+def create_tester(config: configparser.ConfigParser, resolver: Optional[CachingResolver] = None) -> SpeedTester:
+    """创建测速器"""
+    return SpeedTester(
+        timeout=config.getfloat('TESTER', 'timeout', fallback=10),
+        concurrency=config.getint('TESTER', 'concurrency', fallback=8),
+        max_attempts=config.getint('TESTER', 'max_attempts', fallback=2),
+        min_download_speed=config.getfloat('TESTER', 'min_download_speed', fallback=0.1),
+        enable_logging=config.getboolean('TESTER', 'enable_logging', fallback=False),
+        config=config,
+        resolver=resolver
+    )
+
 # ==================== 主流程 ====================
 def print_start_page(config: configparser.ConfigParser, logger: logging.Logger):
     """打印优化后的启动页面"""
@@ -281,60 +374,110 @@ async def main():
 
         # ==================== 数据准备阶段 ====================
         logger.info("\n🔹🔹🔹🔹 阶段1/7：数据准备")
-        blacklist = load_list_file(config.get('BLACKLIST', 'blacklist_path', fallback='config/blacklist.txt'))
+        blacklist = BlacklistIndex.load(
+            config.get('BLACKLIST', 'blacklist_path', fallback='config/blacklist.txt'),
+            config.get('PATHS', 'cache_dir', fallback='cache')
+        )
         whitelist = load_list_file(config.get('WHITELIST', 'whitelist_path', fallback='config/whitelist.txt'))
         urls = load_urls(config.get('PATHS', 'urls_path', fallback='config/urls.txt'))
-        logger.info(f"• 加载黑名单: {len(blacklist)}条")
+        blacklist_stats = blacklist.stats()
+        logger.info(
+            f"• 加载黑名单: {len(blacklist)}条 "
+            f"(URL: {blacklist_stats['url']} | 主机: {blacklist_stats['host']} | 关键词: {blacklist_stats['keyword']})"
+        )
         logger.info(f"• 加载白名单: {len(whitelist)}条")
         logger.info(f"• 加载订阅源: {len(urls)}个")
 
-        # ==================== 订阅源获取阶段 ====================
-        logger.info("\n🔹🔹🔹🔹 阶段2/7：获取订阅源")
+        resolver = create_resolver(config)
         fetcher = SourceFetcher(
             timeout=config.getfloat('FETCHER', 'timeout', fallback=15),
             concurrency=config.getint('FETCHER', 'concurrency', fallback=5),
-            config=config
+            config=config,
+            resolver=resolver
         )
-        contents = await fetch_sources(fetcher, urls, logger)
-        logger.info(f"✅ 获取完成 | 成功: {len(contents)}/{len(urls)}")
-
-        # ==================== 频道解析阶段 ====================
-        logger.info("\n🔹🔹🔹🔹 阶段3/7：解析频道")
         parser = PlaylistParser(config)
-        all_channels = parse_channels(parser, contents, logger)
-        unique_sources = len({c.url for c in all_channels})
-        logger.info(f"✅ 解析完成 | 总频道: {len(all_channels)} | 唯一源: {unique_sources}")
-
-        # ==================== 数据处理阶段 ====================
-        logger.info("\n🔹🔹🔹🔹 阶段4/7：数据处理")
-        unique_channels = remove_duplicates(all_channels, logger)
-        filtered_channels = filter_blacklist(unique_channels, blacklist, logger)
-        logger.info(f"✔ 处理完成 | 去重后: {len(unique_channels)} | 过滤后: {len(filtered_channels)}")
-
-        # ==================== 智能分类阶段 ====================
-        logger.info("\n🔹🔹🔹🔹 阶段5/7：智能分类")
-        matcher = AutoCategoryMatcher(
-            config.get('PATHS', 'templates_path', fallback='config/templates.txt'),
-            config
-        )
-        processed_channels = classify_channels(matcher, filtered_channels, logger)
-        classified = sum(1 for c in processed_channels if c.category != "未分类")
-        logger.info(f"✅ 分类完成 | 已分类: {classified} | 未分类: {len(processed_channels)-classified}")
-
-        # ==================== 测速测试阶段 ====================
-        logger.info("\n🔹🔹🔹🔹 阶段6/7：测速测试")
-        tester = SpeedTester(
-            timeout=config.getfloat('TESTER', 'timeout', fallback=10),
-            concurrency=config.getint('TESTER', 'concurrency', fallback=8),
-            max_attempts=config.getint('TESTER', 'max_attempts', fallback=2),
-            min_download_speed=config.getfloat('TESTER', 'min_download_speed', fallback=0.1),
-            enable_logging=config.getboolean('TESTER', 'enable_logging', fallback=False),
-            config=config
-        )
-        sorted_channels = matcher.sort_channels_by_template(processed_channels, whitelist)
-        failed_urls = await test_channels(tester, sorted_channels, whitelist, logger)
-        online_count = sum(1 for c in sorted_channels if c.status == 'online')
-        logger.info(f"✅ 测速完成 | 在线: {online_count}/{len(sorted_channels)} | 失败: {len(failed_urls)}")
+
+        if config.getboolean('PERFORMANCE', 'pipeline_mode', fallback=False):
+            # ==================== 流水线模式 ====================
+            logger.info("\n🔹🔹🔹🔹 阶段2-6/7：流水线执行（获取解析→去重→过滤→分类→测速）")
+            matcher = create_matcher(config)
+            tester = create_tester(config, resolver)
+            pipeline = ChannelPipeline(
+                fetcher, parser, blacklist, matcher, tester, whitelist,
+                queue_size=config.getint('PERFORMANCE', 'pipeline_queue_size', fallback=2000)
+            )
+            processed_channels, failed_urls = await run_pipeline(pipeline, urls, logger)
+            classified = sum(1 for c in processed_channels if c.category != "未分类")
+            sorted_channels = matcher.sort_channels_by_template(processed_channels, whitelist)
+            online_count = sum(1 for c in sorted_channels if c.status == 'online')
+            logger.info(
+                f"✅ 流水线完成 | 频道: {len(sorted_channels)} | 已分类: {classified} | "
+                f"在线: {online_count} | 失败: {len(failed_urls)}"
+            )
+        elif config.getboolean('PERFORMANCE', 'columnar_store', fallback=False):
+            # ==================== 列式存储模式 ====================
+            logger.info("\n🔹🔹🔹🔹 阶段2-3/7：获取并解析订阅源（列式存储）")
+            if config.getboolean('FETCHER', 'stream_mode', fallback=False):
+                table = await stream_table(fetcher, parser, urls, logger)
+            else:
+                contents = await fetch_sources(fetcher, urls, logger)
+                logger.info(f"✅ 获取完成 | 成功: {len(contents)}/{len(urls)} | 未修改(304): {fetcher.not_modified_count}")
+                table = parse_table(parser, contents, logger)
+                del contents
+            logger.info(
+                f"✅ 解析完成 | 总频道: {len(table)} | 分组: {len(table.categories)} | 主机: {len(table.hosts)}"
+            )
+
+            logger.info("\n🔹🔹🔹🔹 阶段4-5/7：数据处理与智能分类")
+            matcher = create_matcher(config)
+            rows = process_table(table, blacklist, matcher, logger)
+            processed_channels = table.rows(rows)
+            classified = sum(1 for c in processed_channels if c.category != "未分类")
+            logger.info(f"✅ 分类完成 | 已分类: {classified} | 未分类: {len(processed_channels)-classified}")
+
+            logger.info("\n🔹🔹🔹🔹 阶段6/7：测速测试")
+            tester = create_tester(config, resolver)
+            sorted_channels = table.rows(table.sort_by_template(rows, matcher, whitelist))
+            failed_urls = await test_channels(tester, sorted_channels, whitelist, logger)
+            online_count = sum(1 for c in sorted_channels if c.status == 'online')
+            logger.info(f"✅ 测速完成 | 在线: {online_count}/{len(sorted_channels)} | 失败: {len(failed_urls)}")
+        else:
+            # ==================== 订阅源获取阶段 ====================
+            logger.info("\n🔹🔹🔹🔹 阶段2/7：获取订阅源")
+            if config.getboolean('FETCHER', 'stream_mode', fallback=False):
+                # 流式模式：获取与解析合并为一个阶段
+                all_channels = await stream_sources(fetcher, parser, urls, logger)
+                logger.info(f"✅ 流式获取解析完成 | 订阅源: {len(urls)} | 未修改(304): {fetcher.not_modified_count}")
+            else:
+                contents = await fetch_sources(fetcher, urls, logger)
+                logger.info(f"✅ 获取完成 | 成功: {len(contents)}/{len(urls)} | 未修改(304): {fetcher.not_modified_count}")
+
+                # ==================== 频道解析阶段 ====================
+                logger.info("\n🔹🔹🔹🔹 阶段3/7：解析频道")
+                all_channels = parse_channels(parser, contents, logger)
+            unique_sources = len({c.dedup_key for c in all_channels})
+            logger.info(f"✅ 解析完成 | 总频道: {len(all_channels)} | 唯一源: {unique_sources}")
+
+            # ==================== 数据处理阶段 ====================
+            logger.info("\n🔹🔹🔹🔹 阶段4/7：数据处理")
+            unique_channels = remove_duplicates(all_channels, logger)
+            filtered_channels = filter_blacklist(unique_channels, blacklist, logger)
+            logger.info(f"✔ 处理完成 | 去重后: {len(unique_channels)} | 过滤后: {len(filtered_channels)}")
+
+            # ==================== 智能分类阶段 ====================
+            logger.info("\n🔹🔹🔹🔹 阶段5/7：智能分类")
+            matcher = create_matcher(config)
+            processed_channels = classify_channels(matcher, filtered_channels, logger)
+            classified = sum(1 for c in processed_channels if c.category != "未分类")
+            logger.info(f"✅ 分类完成 | 已分类: {classified} | 未分类: {len(processed_channels)-classified}")
+
+            # ==================== 测速测试阶段 ====================
+            logger.info("\n🔹🔹🔹🔹 阶段6/7：测速测试")
+            tester = create_tester(config, resolver)
+            sorted_channels = matcher.sort_channels_by_template(processed_channels, whitelist)
+            failed_urls = await test_channels(tester, sorted_channels, whitelist, logger)
+            online_count = sum(1 for c in sorted_channels if c.status == 'online')
+            logger.info(f"✅ 测速完成 | 在线: {online_count}/{len(sorted_channels)} | 失败: {len(failed_urls)}")
 
         # ==================== 结果导出阶段 ====================
         logger.info("\n🔹🔹🔹🔹 阶段7/7：结果导出")
@@ -345,6 +488,9 @@ async def main():
             matcher=matcher
         )
         await export_results(exporter, sorted_channels, whitelist, logger)
+        matcher.save_cache()
+        if resolver:
+            resolver.save()
 
         # ==================== 最终统计 ====================
         logger.info("\n" + "="*60)
@@ -352,6 +498,33 @@ async def main():
         logger.info(f"• 总处理频道: {len(sorted_channels)}")
         logger.info(f"• 在线频道: {online_count} (成功率: {online_count/len(sorted_channels)*100:.1f}%)")
         logger.info(f"• 未分类频道: {len(processed_channels)-classified}")
+        if tester.limiter and tester.shard_limiters:
+            shard_limiters = sorted(tester.shard_limiters.items())
+            logger.info(
+                f"• 自适应并发: 区间 [{tester.limiter.minimum}, {tester.limiter.maximum}] | "
+                f"各分片最终 {', '.join(str(current) for _, (current, _) in shard_limiters)} | "
+                f"下调 {tester.limiter.decreases}次"
+            )
+            for shard, (_, curve) in shard_limiters:
+                logger.info(f"• 分片{shard}并发曲线: {summarize_curve(curve)}")
+        elif tester.limiter:
+            logger.info(
+                f"• 自适应并发: 区间 [{tester.limiter.minimum}, {tester.limiter.maximum}] | "
+                f"最终 {tester.limiter.current} | 下调 {tester.limiter.decreases}次"
+            )
+            logger.info(f"• 并发曲线: {tester.limiter.curve_summary()}")
+        if tester.keep_alive:
+            logger.info(
+                f"• 测速连接: 新建 {tester.connections_created} | 复用 {tester.connections_reused} | "
+                f"复用率: {tester.connection_reuse_ratio * 100:.1f}%"
+            )
+        if tester.breaker.trips:
+            logger.info(
+                f"• 熔断端点: {tester.breaker.trips} | 跳过频道: {tester.breaker.skipped} | "
+                f"节省超时: 约{tester.breaker_saved_seconds:.0f}秒"
+            )
+        if matcher.cache_hits:
+            logger.info(f"• 分类缓存命中: {matcher.cache_hits}/{len(matcher.match_cache)}个名称")
         logger.info("="*60 + "\n🎉🎉 任务完成！")
 
     except KeyboardInterrupt:
@@ -0,0 +1,10 @@
+#!/usr/bin/env python3
+"""
+分布式测速工作节点
+
+用法: python worker.py http://协调器地址:端口 [--token 令牌] [--name 节点名称] [--processes 进程数]
+"""
+from core.distributed import worker_main
+
+if __name__ == "__main__":
+    worker_main()